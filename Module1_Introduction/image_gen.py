@@ -8,8 +8,8 @@ with open('vocabulary_usage_frequencies.json', 'r') as f:
 
 # Prepare data for plotting
 words = list(data.keys())
-explicit_counts = [data[word]["explicit_count"] for word in words]
-implicit_counts = [data[word]["implicit_count"] for word in words]
+explicit_counts = np.fromiter((data[w]["explicit_count"] for w in words), dtype=int, count=len(words))
+implicit_counts = np.fromiter((data[w]["implicit_count"] for w in words), dtype=int, count=len(words))
 
 x = np.arange(len(words))  # label locations
 width = 0.35  # width of the bars
@@ -25,19 +25,9 @@ ax.set_xticks(x)
 ax.set_xticklabels(words, rotation=45, ha='right')
 ax.legend()
 
-# Add value labels on top of bars
-def autolabel(rects):
-    for rect in rects:
-        height = rect.get_height()
-        if height > 0:
-            ax.annotate('{}'.format(height),
-                        xy=(rect.get_x() + rect.get_width() / 2, height),
-                        xytext=(0, 3),  # 3 points vertical offset
-                        textcoords="offset points",
-                        ha='center', va='bottom')
-
-autolabel(rects1)
-autolabel(rects2)
+# Add value labels on top of bars (zero-height bars stay unlabeled)
+ax.bar_label(rects1, labels=[f"{c}" if c else "" for c in explicit_counts], padding=3)
+ax.bar_label(rects2, labels=[f"{c}" if c else "" for c in implicit_counts], padding=3)
 
 fig.tight_layout()
 plt.savefig('vocabulary_usage_frequencies.png', dpi=300)
\ No newline at end of file
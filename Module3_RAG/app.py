@@ -1,29 +1,47 @@
+from queue import Queue
+from threading import Thread
+
 import gradio as gr
 
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain.memory import ConversationBufferMemory
 from langchain_community.chains import ConversationalRetrievalChain
+from langchain_core.callbacks import BaseCallbackHandler
+
+from config import EMBEDDING_MODEL, CHAT_MODEL, DB_DIR, get_api_key
 
-from config import EMBEDDING_MODEL, CHAT_MODEL, DB_DIR
 
+get_api_key()
 
 #Embedding client
 embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
 
-#load FAISS vector store saved earlier
+#load FAISS vector store saved earlier (normalized queries + inner product = cosine)
 vectorstore = FAISS.load_local(
     DB_DIR,
     embeddings,
     allow_dangerous_deserialization=True,
+    normalize_L2=True,
+    distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
 )
 
-#LLM client
+#LLM client (rewrites follow-up questions into standalone ones)
 llm = ChatOpenAI(
     temperature=0.7,
     model_name=CHAT_MODEL,
 )
 
+#streaming LLM client for the final answer; tagged so only its tokens reach the UI
+ANSWER_TAG = "answer"
+answer_llm = ChatOpenAI(
+    temperature=0.7,
+    model_name=CHAT_MODEL,
+    streaming=True,
+    tags=[ANSWER_TAG],
+)
+
 #conversation memory
 memory = ConversationBufferMemory(
     memory_key="chat_history",
@@ -35,20 +53,58 @@ retriever = vectorstore.as_retriever()
 
 #RAG chain: question + retrieved docs -> LLM
 conversation_chain = ConversationalRetrievalChain.from_llm(
-    llm=llm,
+    llm=answer_llm,
+    condense_question_llm=llm,
     retriever=retriever,
     memory=memory,
 )
 
 
+class AnswerTokenQueue(BaseCallbackHandler):
+    """Collects streamed tokens of the answer LLM into a queue."""
+
+    def __init__(self):
+        self.queue = Queue()
+
+    def on_llm_new_token(self, token: str, *, tags=None, **kwargs):
+        if tags and ANSWER_TAG in tags:
+            self.queue.put(token)
+
+
 #gradio ChatInterface wrapper
 def chat(message, history):
     """
     Gradio passes current message and full history.
     We only need the message; history is already in LangChain memory.
+    The chain runs in a worker thread and answer tokens are yielded as
+    they arrive, so the first words show up before the full response.
     """
-    result = conversation_chain.invoke({"question": message})
-    return result["answer"]
+    handler = AnswerTokenQueue()
+    done = object()
+    outcome = {}
+
+    def run_chain():
+        try:
+            outcome["result"] = conversation_chain.invoke(
+                {"question": message},
+                config={"callbacks": [handler]},
+            )
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            handler.queue.put(done)
+
+    Thread(target=run_chain, daemon=True).start()
+
+    partial = ""
+    while (token := handler.queue.get()) is not done:
+        partial += token
+        yield partial
+
+    if "error" in outcome:
+        raise outcome["error"]
+    if not partial:
+        yield outcome["result"]["answer"]
 
 
 demo = gr.ChatInterface(
@@ -1,4 +1,4 @@
-
+import functools
 import os
 from dotenv import load_dotenv
 
@@ -8,11 +8,19 @@ DB_DIR = "vector_db"
 DB_DIR_OVERLAP = "vector_db_overlap"
 KNOWLEDGE_BASE_DIR = "knowledge-base"
 EVAL_FILE = 'eval_queries.jsonl'
+EMBEDDING_CACHE_DIR = "emb_cache"
+
 
-# Load .env with OPENAI_API_KEY
-load_dotenv(override=True)
-api_key = os.getenv("OPENAI_API_KEY")
+@functools.cache
+def get_api_key() -> str:
+    """
+    Load .env with OPENAI_API_KEY once per process (on first use, not on import)
+    and export it for the OpenAI/LangChain clients.
+    """
+    load_dotenv(override=True)
+    api_key = os.getenv("OPENAI_API_KEY")
 
-if not api_key:
-    raise ValueError("OPENAI_API_KEY is not set in your environment/.env")
-os.environ["OPENAI_API_KEY"] = api_key
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY is not set in your environment/.env")
+    os.environ["OPENAI_API_KEY"] = api_key
+    return api_key
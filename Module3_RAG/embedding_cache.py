@@ -0,0 +1,20 @@
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_openai import OpenAIEmbeddings
+
+from config import EMBEDDING_MODEL, EMBEDDING_CACHE_DIR, get_api_key
+
+
+def get_cached_embeddings(model: str = EMBEDDING_MODEL):
+    """
+    OpenAI embeddings backed by a local file store, keyed by a hash of the
+    text and namespaced by model name. Re-running ingest/eval over the same
+    chunks and questions reads vectors from disk instead of calling the API.
+    """
+    get_api_key()
+    store = LocalFileStore(EMBEDDING_CACHE_DIR)
+    return CacheBackedEmbeddings.from_bytes_store(
+        OpenAIEmbeddings(model=model),
+        store,
+        namespace=model,
+    )
@@ -3,23 +3,103 @@ import warnings
 warnings.filterwarnings("ignore")  # ignore all Python warnings
 
 import argparse
+import functools
 import json
 import os
 from datetime import datetime
 from pathlib import Path
 
-from langchain_openai import OpenAIEmbeddings
+import faiss
+import numpy as np
+import orjson
 from langchain.vectorstores import FAISS
-from sentence_transformers import CrossEncoder
+from langchain_community.vectorstores.utils import (
+    DistanceStrategy,
+    maximal_marginal_relevance,
+)
+from flashrank import Ranker, RerankRequest
 
-from config import EMBEDDING_MODEL  # same model as in ingest
+from embedding_cache import get_cached_embeddings  # same model as in ingest
+
+# FlashRank ships INT8 ONNX cross-encoders (no torch); TinyBERT-L-2 is
+# ~20x faster than MiniLM-L-6 on CPU at similar recall
+DEFAULT_RERANKER_MODEL = "ms-marco-TinyBERT-L-2-v2"
+RERANKER_CACHE_DIR = "/tmp/flashrank"
+# FlashRank tokenizes all (query, passage) pairs of a request in one batch;
+# 256 tokens instead of 512 roughly halves attention cost per pair
+RERANKER_MAX_LENGTH = 256
 
 
 def load_eval_queries(path: str):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return orjson.loads(Path(path).read_bytes())
+
+
+@functools.lru_cache(maxsize=None)
+def _get_embeddings():
+    return get_cached_embeddings()
+
+
+@functools.lru_cache(maxsize=4)
+def _get_vs(db_dir: str):
+    """Load a FAISS store once per db_dir; later sweeps reuse it."""
+    return FAISS.load_local(
+        db_dir,
+        _get_embeddings(),
+        allow_dangerous_deserialization=True,
+        normalize_L2=True,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
 
 
+@functools.lru_cache(maxsize=2)
+def _get_reranker(model_name: str):
+    """Model load dominates repeated rerank runs, so keep it around."""
+    return Ranker(
+        model_name=model_name,
+        cache_dir=RERANKER_CACHE_DIR,
+        max_length=RERANKER_MAX_LENGTH,
+    )
+
+
+def batch_retrieve(
+    vectorstore,
+    embeddings,
+    questions,
+    fetch_k: int,
+    mmr_k: int | None = None,
+    lambda_mult: float = 0.5,
+):
+    """
+    Embed all questions in one request and run a single FAISS search
+    over the whole query matrix. Returns a list of Document lists,
+    one per question, in similarity order.
+    If mmr_k is set, the fetch_k candidates of each question are narrowed
+    to mmr_k diverse ones with LangChain's (numpy) MMR selection.
+    """
+    if not questions:
+        return []
+
+    query_vecs = np.asarray(embeddings.embed_documents(questions), dtype="float32")
+    faiss.normalize_L2(query_vecs)  # index stores unit vectors (cosine via IP)
+    _, indices = vectorstore.index.search(query_vecs, fetch_k)
+
+    results = []
+    for query_vec, row in zip(query_vecs, indices):
+        ids = [int(idx) for idx in row if idx != -1]  # FAISS pads with -1
+        if mmr_k is not None and ids:
+            candidates = vectorstore.index.reconstruct_batch(np.asarray(ids, dtype="int64"))
+            picked = maximal_marginal_relevance(
+                query_vec, candidates, lambda_mult=lambda_mult, k=mmr_k
+            )
+            ids = [ids[j] for j in picked]
+
+        docs = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[idx])
+            for idx in ids
+        ]
+        results.append(docs)
+    return results
+
 
 def evaluate_metrics(
     db_dir: str,
@@ -27,32 +107,43 @@ def evaluate_metrics(
     k: int = 5,
     rerank: bool = False,
     pre_k: int = 20,
+    reranker_model: str = DEFAULT_RERANKER_MODEL,
+    mmr: bool = False,
+    lambda_mult: float = 0.5,
 ):
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
-    vectorstore = FAISS.load_local(
-        db_dir,
-        embeddings,
-        allow_dangerous_deserialization=True,
-    )
+    if rerank and mmr:
+        raise ValueError("rerank and mmr are mutually exclusive")
+
+    embeddings = _get_embeddings()
+    vectorstore = _get_vs(db_dir)
+
+    if (rerank or mmr) and pre_k < k:
+        pre_k = k
 
     if rerank:
-        if pre_k < k:
-            pre_k = k
-        reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-        retriever = None
+        reranker = _get_reranker(reranker_model)
     else:
         reranker = None
-        retriever = vectorstore.as_retriever(search_kwargs={"k": k})
 
     queries = load_eval_queries(eval_file)
 
+    # one embedding round-trip + one FAISS search for all questions
+    retrieved = batch_retrieve(
+        vectorstore,
+        embeddings,
+        [q["question"] for q in queries],
+        pre_k if (rerank or mmr) else k,
+        mmr_k=k if mmr else None,
+        lambda_mult=lambda_mult,
+    )
+
     total = len(queries)
     doc_type_hits = 0
     rank_scores = []
 
     details = []
 
-    for q in queries:
+    for q, docs in zip(queries, retrieved):
         question = q["question"]
         expected_doc_type = q.get("expected_doc_type")
 
@@ -63,10 +154,10 @@ def evaluate_metrics(
         single_basename = q.get("expected_source_basename")
         if single_basename and single_basename not in expected_basenames:
             expected_basenames.append(single_basename)
+        expected_set = frozenset(expected_basenames)
 
         # -------- retrieve documents --------
         if rerank:
-            docs = vectorstore.similarity_search(question, k=pre_k)
             if not docs:
                 rank_scores.append(0.0)
                 details.append(
@@ -85,13 +176,17 @@ def evaluate_metrics(
                 )
                 continue
 
-            pairs = [(question, d.page_content) for d in docs]
-            scores = reranker.predict(pairs)
-            scored_docs = list(zip(docs, scores))
-            scored_docs.sort(key=lambda x: x[1], reverse=True)
-            top_docs = [d for d, _ in scored_docs[:k]]
+            request = RerankRequest(
+                query=question,
+                passages=[
+                    {"id": i, "text": d.page_content, "meta": d.metadata}
+                    for i, d in enumerate(docs)
+                ],
+            )
+            ranked = reranker.rerank(request)  # sorted by score, descending
+            top_docs = [docs[r["id"]] for r in ranked[:k]]
         else:
-            top_docs = retriever.get_relevant_documents(question)
+            top_docs = docs
 
         retrieved_types = [d.metadata.get("doc_type", "unknown") for d in top_docs]
         retrieved_sources = [d.metadata.get("source", "") for d in top_docs]
@@ -107,18 +202,16 @@ def evaluate_metrics(
         file_hit = False
         file_rank = None
 
-        if expected_basenames:
-            match_positions = []
-            for idx, src in enumerate(retrieved_sources):
-                if not src:
-                    continue
-                base = os.path.basename(src)
-                if base in expected_basenames:
-                    match_positions.append(idx)
+        if expected_set:
+            basenames = [os.path.basename(src) if src else "" for src in retrieved_sources]
+            # first position is the best rank among matches
+            file_rank = next(
+                (idx for idx, base in enumerate(basenames) if base in expected_set),
+                None,
+            )
 
-            if match_positions:
+            if file_rank is not None:
                 file_hit = True
-                file_rank = min(match_positions)  # best rank among matches
                 rank_score = (k - file_rank) / float(k)  # 1st→1.0, kth→1/k
 
         rank_scores.append(rank_score)
@@ -139,7 +232,7 @@ def evaluate_metrics(
         )
 
     hit_at_k = doc_type_hits / total if total else 0.0
-    avg_rank_score = sum(rank_scores) / total if total else 0.0
+    avg_rank_score = float(np.mean(rank_scores)) if total else 0.0
 
     metrics = {
         "num_queries": total,
@@ -159,6 +252,7 @@ def append_to_report(
     metrics: dict,
     rerank: bool,
     pre_k: int | None,
+    mmr: bool = False,
 ):
     now = datetime.now().strftime("%Y-%m-%d %H:%M")
 
@@ -168,9 +262,10 @@ def append_to_report(
         f"**Eval file:** `{eval_file}`  \n"
         f"**Top-K (k):** `{k}`  \n"
         f"**Rerank:** `{rerank}`  \n"
+        f"**MMR:** `{mmr}`  \n"
     )
-    if rerank and pre_k is not None:
-        body += f"**Top-pre-K (before rerank):** `{pre_k}`  \n"
+    if (rerank or mmr) and pre_k is not None:
+        body += f"**Top-pre-K (before rerank/MMR):** `{pre_k}`  \n"
 
     body += (
         f"\n**Hit@{k} (doc_type):** `{metrics['hit_at_k_doc_type']:.3f}`  \n"
@@ -209,16 +304,34 @@ def main():
         default=5,
         help="Top-K for retrieval (and after rerank).",
     )
-    parser.add_argument(
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
         "--rerank",
         action="store_true",
-        help="Use cross-encoder reranker on top of FAISS.",
+        help="Use FlashRank cross-encoder reranker on top of FAISS.",
+    )
+    mode.add_argument(
+        "--mmr",
+        action="store_true",
+        help="Pick k diverse chunks out of pre-K with MMR (no extra model).",
     )
     parser.add_argument(
         "--pre-k",
         type=int,
         default=25,
-        help="Top-pre-K from FAISS before rerank (only used if --rerank).",
+        help="Top-pre-K from FAISS before rerank/MMR (only used if --rerank or --mmr).",
+    )
+    parser.add_argument(
+        "--lambda-mult",
+        type=float,
+        default=0.5,
+        help="MMR relevance/diversity trade-off, 1.0 = pure relevance (only used if --mmr).",
+    )
+    parser.add_argument(
+        "--reranker-model",
+        type=str,
+        default=DEFAULT_RERANKER_MODEL,
+        help="FlashRank model for reranking (only used if --rerank).",
     )
     parser.add_argument(
         "--label",
@@ -241,10 +354,14 @@ def main():
         k=args.k,
         rerank=args.rerank,
         pre_k=args.pre_k,
+        reranker_model=args.reranker_model,
+        mmr=args.mmr,
+        lambda_mult=args.lambda_mult,
     )
 
-    with open(f"details{args.label}.json", "w", encoding="utf-8") as f:
-        json.dump(details, f, indent=4, ensure_ascii=False)
+    Path(f"details{args.label}.json").write_bytes(
+        orjson.dumps(details, option=orjson.OPT_INDENT_2)
+    )
 
     print(json.dumps(metrics, indent=2))
     append_to_report(
@@ -255,7 +372,8 @@ def main():
         k=args.k,
         metrics=metrics,
         rerank=args.rerank,
-        pre_k=args.pre_k if args.rerank else None,
+        pre_k=args.pre_k if (args.rerank or args.mmr) else None,
+        mmr=args.mmr,
     )
 
 
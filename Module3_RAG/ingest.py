@@ -1,55 +1,132 @@
 import glob
+import math
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain.text_splitter import CharacterTextSplitter, RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 
 from config import EMBEDDING_MODEL, KNOWLEDGE_BASE_DIR, DB_DIR, DB_DIR_OVERLAP
+from embedding_cache import get_cached_embeddings
+
+
+def _load_folder(folder: str):
+    """Load every .md file under one folder and tag it with doc_type."""
+    doc_type = os.path.basename(folder)
+    loader = DirectoryLoader(
+        folder,
+        glob="**/*.md",
+        loader_cls=TextLoader,
+        loader_kwargs={"encoding": "utf-8"},
+        use_multithreading=True,
+        max_concurrency=16,
+    )
+    folder_docs = loader.load()
+    for doc in folder_docs:
+        doc.metadata["doc_type"] = doc_type
+    return folder_docs
 
 
 def load_documents(base_dir: str):
     """
     Load all .md files from subfolders of base_dir.
     Each subfolder name becomes metadata['doc_type'] (as in the notebook).
+    Folders are loaded concurrently (file reads release the GIL).
     """
-    folders = glob.glob(os.path.join(base_dir, "*"))
-    text_loader_kwargs = {"encoding": "utf-8"}
+    folders = [f for f in glob.glob(os.path.join(base_dir, "*")) if os.path.isdir(f)]
 
     documents = []
-    for folder in folders:
-        if not os.path.isdir(folder):
-            continue
-        doc_type = os.path.basename(folder)
-        loader = DirectoryLoader(
-            folder,
-            glob="**/*.md",
-            loader_cls=TextLoader,
-            loader_kwargs=text_loader_kwargs,
-        )
-        folder_docs = loader.load()
-        for doc in folder_docs:
-            doc.metadata["doc_type"] = doc_type
-            documents.append(doc)
+    if folders:
+        with ThreadPoolExecutor(max_workers=min(32, len(folders))) as ex:
+            for folder_docs in ex.map(_load_folder, folders):
+                documents.extend(folder_docs)
 
     print(f"Loaded {len(documents)} documents from {base_dir}")
     return documents
 
 
+def compress_to_fp16(vectorstore):
+    """
+    Re-store the flat index as fp16 (IndexScalarQuantizer, same metric):
+    half the memory and half the bandwidth per brute-force scan.
+    """
+    flat = vectorstore.index
+    n, d = flat.ntotal, flat.d
+    xb = flat.reconstruct_n(0, n)  # already unit-length (normalize_L2=True)
+
+    sq = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, flat.metric_type)
+    sq.train(xb)
+    sq.add(xb)  # same order, so index_to_docstore_id stays valid
+
+    vectorstore.index = sq
+    print(f"Converted index to fp16 scalar quantizer ({n} vectors)")
+    return vectorstore
+
+
+def compress_to_ivfpq(vectorstore, m: int = 64, nbits: int = 8, nprobe: int = 16):
+    """
+    Replace the flat index with an IndexIVFPQ (nlist ~ sqrt(N)) that keeps
+    the same metric.
+    PQ stores each vector in m bytes and IVF only scans nprobe/nlist of
+    the lists per query. PQ training needs at least 2**nbits vectors,
+    so small stores fall back to an fp16 flat index.
+    """
+    flat = vectorstore.index
+    n, d = flat.ntotal, flat.d
+    if n < 2 ** nbits:
+        print(f"{n} vectors is too few for IVFPQ")
+        return compress_to_fp16(vectorstore)
+    if d % m != 0:
+        print(f"Dimension {d} not divisible by m={m}, skipping IVFPQ")
+        return compress_to_fp16(vectorstore)
+
+    nlist = max(1, int(math.sqrt(n)))
+    xb = flat.reconstruct_n(0, n)
+
+    metric = flat.metric_type
+    if metric == faiss.METRIC_INNER_PRODUCT:
+        quantizer = faiss.IndexFlatIP(d)
+    else:
+        quantizer = faiss.IndexFlatL2(d)
+    ivf = faiss.IndexIVFPQ(quantizer, d, nlist, m, nbits, metric)
+    ivf.train(xb)
+    ivf.add(xb)  # same order, so index_to_docstore_id stays valid
+    ivf.nprobe = min(nprobe, nlist)
+    ivf.make_direct_map()  # reconstruct(id) is needed for MMR in eval
+
+    vectorstore.index = ivf
+    print(f"Converted index to IVFPQ (nlist={nlist}, m={m}, nprobe={ivf.nprobe})")
+    return vectorstore
+
+
 def build_and_save_vectorstore():
     #load docs
     documents = load_documents(KNOWLEDGE_BASE_DIR)
 
-    #split into chunks 
-    text_splitter = CharacterTextSplitter(chunk_size=1500, chunk_overlap=False)
+    #split into chunks measured in tokens (tiktoken), not characters
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        model_name=EMBEDDING_MODEL,
+        chunk_size=512,
+        chunk_overlap=64,
+    )
     chunks = text_splitter.split_documents(documents)
     print(f"Total number of chunks: {len(chunks)}")
     print(f"Document types: {set(doc.metadata['doc_type'] for doc in documents)}")
 
-    #create embeddings client  FAISS vector store
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
-    vectorstore = FAISS.from_documents(chunks, embedding=embeddings)
+    #create (disk-cached) embeddings client  FAISS vector store
+    embeddings = get_cached_embeddings()
+    # unit-length vectors + IndexFlatIP == cosine similarity
+    vectorstore = FAISS.from_documents(
+        chunks,
+        embedding=embeddings,
+        normalize_L2=True,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+    vectorstore = compress_to_ivfpq(vectorstore)
 
     total_vectors = vectorstore.index.ntotal
     dimensions = vectorstore.index.d
@@ -72,9 +149,16 @@ def build_and_save_vectorstore_overlap():
     chunks = splitter.split_documents(documents)
     print(f"[overlap] Total chunks: {len(chunks)}")
 
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    embeddings = get_cached_embeddings()
 
-    vectorstore = FAISS.from_documents(chunks, embedding=embeddings)
+    # unit-length vectors + IndexFlatIP == cosine similarity
+    vectorstore = FAISS.from_documents(
+        chunks,
+        embedding=embeddings,
+        normalize_L2=True,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+    )
+    vectorstore = compress_to_ivfpq(vectorstore)
 
     total_vectors = vectorstore.index.ntotal
     dimensions = vectorstore.index.d
@@ -1,78 +1,157 @@
 from openai import OpenAI
-from typing import Dict, Any
-import json
+from pydantic import BaseModel
+from typing import Callable, Dict, Any, Optional
+import copy
+import functools
+import logging
 import re
 
+log = logging.getLogger(__name__)
+
+_GREETING_RE = re.compile(
+    r"^(hi|hello|hey|yo|good (morning|evening|afternoon))[!.\s]*$", re.I
+)
+
+# Fast path for unambiguous single-intent queries; anything else goes to the LLM.
+# A weather capture is only trusted when it is a known place (see _fast_intent)
+_WEATHER_WORD_RE = re.compile(r"\b(weather|temperature|forecast|rain|snow)\b", re.I)
+_NEWS_WORD_RE = re.compile(r"\b(news|headlines?)\b", re.I)
+_FAST_WEATHER_RES = (
+    # "weather in paris", "what's the temperature in new york?"
+    re.compile(
+        r"^(?:what(?:'s| is) the )?(?:weather|temperature|forecast)(?: like)? (?:in|for|at) "
+        r"(?P<location>[a-z][a-z .'-]*?)[?!.\s]*$", re.I
+    ),
+    # "tokyo weather"
+    re.compile(r"^(?P<location>[a-z][a-z .'-]*?) (?:weather|temperature|forecast)[?!.\s]*$", re.I),
+)
+# "latest tech news", "top headlines", "sports news"
+_FAST_NEWS_RE = re.compile(
+    r"^(?:(?:latest|top|recent|today's) )?(?:(?P<topic>[a-z]+) )?(?:news|headlines)[?!.\s]*$", re.I
+)
+_GENERIC_TOPICS = frozenset({"the", "any", "some", "latest", "top", "recent"})
+# Topics taken without the LLM; "good news", "fake news" etc. are not topics
+_NEWS_TOPICS = frozenset({
+    "general", "world", "tech", "technology", "business", "sports", "science",
+    "health", "entertainment", "politics", "travel", "food",
+})
+
+class WeatherIntent(BaseModel):
+    needed: bool
+    location: Optional[str]
+
+
+class NewsIntent(BaseModel):
+    needed: bool
+    topic: Optional[str]
+
+
+class Intent(BaseModel):
+    weather: WeatherIntent
+    news: NewsIntent
+
+
+SYSTEM_PROMPT = """Classify whether the user wants weather (with location) and/or news (with topic, 'general' if unspecified).
+A bare location or "what's happening in X" needs BOTH weather and news; greetings need NEITHER.
+Use null for location/topic when not needed."""
+
+
+def _fast_intent(query: str, is_known_location: Callable[[str], bool]) -> Optional[Dict[str, Any]]:
+    """
+    Classify weather-only / news-only queries by regex, or None if ambiguous.
+    The captured location must pass is_known_location: "nice weather" or
+    "weather in paris this weekend" capture text that is not a place.
+    """
+    wants_weather = bool(_WEATHER_WORD_RE.search(query))
+    wants_news = bool(_NEWS_WORD_RE.search(query))
+    if wants_weather == wants_news:
+        return None
+    
+    if wants_weather:
+        for pattern in _FAST_WEATHER_RES:
+            match = pattern.match(query)
+            if match and is_known_location(match["location"].strip()):
+                return {
+                    "weather": {"needed": True, "location": match["location"].strip()},
+                    "news": {"needed": False, "topic": None}
+                }
+        return None
+    
+    match = _FAST_NEWS_RE.match(query)
+    if not match:
+        return None
+    topic = match["topic"]
+    if not topic or topic in _GENERIC_TOPICS:
+        topic = "general"
+    elif topic not in _NEWS_TOPICS:
+        return None
+    return {
+        "weather": {"needed": False, "location": None},
+        "news": {"needed": True, "topic": topic}
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def _classify_cached(client: OpenAI, model: str, query: str) -> Dict[str, Any]:
+    """Call the LLM once per (client, model, normalized query); errors are not cached"""
+    # Structured outputs: the response is validated against the Intent schema,
+    # so no JSON parsing or few-shot format examples are needed
+    response = client.beta.chat.completions.parse(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": query}
+        ],
+        temperature=0.3,
+        max_tokens=200,
+        response_format=Intent
+    )
+    intent = response.choices[0].message.parsed
+    if intent is None:
+        raise ValueError(response.choices[0].message.refusal or "Empty intent response")
+    return intent.model_dump()
+
+
 class IntentClassifier:
     """
     Classifies user intent to determine which MCP servers to query
     """
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, is_known_location: Optional[Callable[[str], bool]] = None):
         self.client = OpenAI(api_key=api_key)
         self.model = "gpt-4o-mini"
+        # Places the weather fast path may trust; without it every weather query goes to the LLM
+        self.is_known_location = is_known_location or (lambda location: False)
+    
+    def is_greeting(self, query: str) -> bool:
+        """True for bare greetings like 'Hello!' that need no data or LLM call"""
+        return bool(_GREETING_RE.match(query.strip()))
+    
+    def fast_intent(self, query: str) -> Optional[Dict[str, Any]]:
+        """Regex-only classification (no API call), or None when the LLM is needed"""
+        return _fast_intent(query.strip().lower(), self.is_known_location)
     
     def classify(self, query: str) -> Dict[str, Any]:
         """
         Classify user query into intents: weather, news, or both
         Returns structured intent data
         """
+        normalized = query.strip().lower()
         
-        system_prompt = """You are an intent classifier. Analyze the user's query and determine:
-1. If they want weather information (and which location)
-2. If they want news (and which topic, if specified)
-
-IMPORTANT RULES:
-- If query mentions "today", "happening", "what's going on" with a location → BOTH weather AND news
-- If just a location name with no clear intent → BOTH weather AND news
-- "Hello", "Hi", greetings → NEITHER weather NOR news
-- Pure weather queries: "weather in X", "temperature in X" → ONLY weather
-- Pure news queries: "tech news", "latest headlines" → ONLY news
-
-Respond ONLY with valid JSON:
-{
-    "weather": {
-        "needed": true/false,
-        "location": "city name or null"
-    },
-    "news": {
-        "needed": true/false,
-        "topic": "topic or null (use 'general' for general news)"
-    }
-}
-
-Examples:
-- "What's happening in London today?" → {"weather": {"needed": true, "location": "London"}, "news": {"needed": true, "topic": "general"}}
-- "weather in Paris" → {"weather": {"needed": true, "location": "Paris"}, "news": {"needed": false, "topic": null}}
-- "tech news" → {"weather": {"needed": false, "location": null}, "news": {"needed": true, "topic": "technology"}}
-- "Hello" → {"weather": {"needed": false, "location": null}, "news": {"needed": false, "topic": null}}
-- "Tell me about Tokyo" → {"weather": {"needed": true, "location": "Tokyo"}, "news": {"needed": true, "topic": "general"}}"""
+        # Greetings never need weather or news, so skip the LLM
+        if _GREETING_RE.match(normalized):
+            return self._default_intent()
+        
+        fast = self.fast_intent(normalized)
+        if fast is not None:
+            return fast
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": query}
-                ],
-                temperature=0.3,
-                max_tokens=200
-            )
-            
-            content = response.choices[0].message.content.strip()
+            # Copy so callers can't mutate the cached entry
+            return copy.deepcopy(_classify_cached(self.client, self.model, normalized))
             
-            # Remove markdown code blocks if present
-            content = re.sub(r'```json\s*|\s*```', '', content)
-            
-            intent = json.loads(content)
-            return intent
-            
-        except json.JSONDecodeError as e:
-            print(f"JSON decode error: {e}")
-            print(f"Response was: {content}")
-            return self._default_intent()
         except Exception as e:
-            print(f"Intent classification error: {e}")
+            log.warning("intent classification failed: %s", e)
             return self._default_intent()
     
     def _default_intent(self) -> Dict[str, Any]:
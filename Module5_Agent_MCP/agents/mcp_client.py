@@ -1,7 +1,87 @@
 import asyncio
-from typing import Dict, Any, Optional
+import functools
+import logging
+import time
+from itertools import islice
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
 import aiohttp
-import json
+import msgspec
+import orjson
+from cachetools import TTLCache
+
+log = logging.getLogger(__name__)
+
+_GEO_URL = "https://geocoding-api.open-meteo.com/v1/search"
+_FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+_NEWS_ALL_URL = "https://api.thenewsapi.com/v1/news/all"
+_NEWS_TOP_URL = "https://api.thenewsapi.com/v1/news/top"
+_FORECAST_FIELDS = "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m"
+
+# Network/HTTP failures, timeouts and malformed or unexpected JSON
+_FETCH_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, msgspec.DecodeError)
+
+
+# Typed views of the upstream payloads; defaults cover missing fields
+class _Place(msgspec.Struct):
+    latitude: float
+    longitude: float
+    name: str
+    country: str = ""
+
+
+class _GeoResults(msgspec.Struct):
+    results: List[_Place] = []
+
+
+class _Current(msgspec.Struct):
+    temperature_2m: float = 0.0
+    apparent_temperature: float = 0.0
+    relative_humidity_2m: int = 0
+    wind_speed_10m: float = 0.0
+    weather_code: int = 0
+    precipitation: float = 0.0
+
+
+class _Forecast(msgspec.Struct):
+    current: _Current = msgspec.field(default_factory=_Current)
+
+
+class _Article(msgspec.Struct):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    url: Optional[str] = None
+    published_at: Optional[str] = None
+    source: Optional[str] = None
+
+
+class _NewsPage(msgspec.Struct):
+    data: List[_Article] = []
+
+
+_GEO_DECODER = msgspec.json.Decoder(_GeoResults)
+_FORECAST_DECODER = msgspec.json.Decoder(_Forecast)
+_NEWS_DECODER = msgspec.json.Decoder(_NewsPage)
+
+# Open-Meteo WMO weather codes -> readable condition
+_WEATHER_CODES: Dict[int, str] = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Foggy", 51: "Light drizzle", 61: "Slight rain", 63: "Moderate rain",
+    65: "Heavy rain", 71: "Slight snow", 95: "Thunderstorm"
+}
+
+# Circuit breaker: after this many consecutive failures, skip the upstream for the cooldown
+_BREAKER_THRESHOLD = 3
+_BREAKER_COOLDOWN = 30.0  # seconds
+
+# Pre-geocoded on startup so their first weather lookup is a single request
+POPULAR_CITIES = ("New York", "London", "Paris", "Tokyo", "Sydney", "Berlin", "Toronto", "San Francisco")
+_POPULAR_KEYS = frozenset(city.lower() for city in POPULAR_CITIES)
+
+# Forecasts of locations requested within the last interval are refreshed in
+# the background, so repeat lookups are served from cache with no network I/O
+_FORECAST_REFRESH_INTERVAL = 300.0  # seconds
+_FORECAST_REFRESH_MAX = 16
+
 
 class MCPClient:
     """
@@ -13,138 +93,247 @@ class MCPClient:
         self.weather_available = False
         self.news_available = False
         self.news_api_key = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._request_slots: Optional[asyncio.Semaphore] = None
+        # Successful results only, keyed on normalized input
+        self._geo_cache = TTLCache(maxsize=1024, ttl=30 * 24 * 3600)  # 30 days
+        self._weather_cache = TTLCache(maxsize=512, ttl=15 * 60)
+        self._news_cache = TTLCache(maxsize=256, ttl=10 * 60)
+        # In-flight fetches, so concurrent identical requests share one call
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._prewarm_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        # weather cache key -> (monotonic time last requested, location as asked)
+        self._weather_used: Dict[str, Tuple[float, str]] = {}
+        self._breakers = {
+            "weather": {"failures": 0, "open_until": 0.0},
+            "news": {"failures": 0, "open_until": 0.0}
+        }
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared session, creating it on first use. The session is
+        bound to the loop that created it (the orchestrator's persistent loop);
+        use from another loop is a bug, not a reason to open a second session.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session_loop is not None and self._session_loop is not loop:
+            raise RuntimeError("MCPClient used from a different event loop; call aclose() first")
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100,
+                    limit_per_host=20,
+                    ttl_dns_cache=300,
+                    use_dns_cache=True,
+                    enable_cleanup_closed=True,
+                    keepalive_timeout=75
+                ),
+                timeout=aiohttp.ClientTimeout(total=10),
+                # br is decoded via the Brotli package from aiohttp[speedups]
+                headers={"Accept-Encoding": "gzip, deflate, br"},
+                json_serialize=lambda o: orjson.dumps(o).decode(),
+                raise_for_status=True
+            )
+            self._session_loop = loop
+            # Caps in-flight outbound requests from this client at the per-host limit
+            self._request_slots = asyncio.Semaphore(20)
+        return self._session
+    
+    def stop_background(self):
+        """Cancel the prewarm and forecast refresh tasks; call on the client's loop"""
+        for task in (self._prewarm_task, self._refresh_task):
+            if task and not task.done():
+                task.cancel()
+    
+    async def aclose(self):
+        """Stop background refreshes and close the shared HTTP session"""
+        self.stop_background()
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
         
-    async def initialize_all_servers(self) -> Dict[str, bool]:
-        """Initialize all MCP server connections"""
-        import os
-        
-        # Weather is always available (Open-Meteo is free)
+    async def _prewarm(self):
+        """Geocode POPULAR_CITIES and open a keep-alive connection to the forecast host"""
+        await asyncio.gather(
+            *(self._geocode(city) for city in POPULAR_CITIES),
+            return_exceptions=True
+        )
+        try:
+            session = await self._get_session()
+            async with session.head(_FORECAST_URL, raise_for_status=False):
+                pass
+        except _FETCH_ERRORS:
+            pass
+    
+    async def _refresh_forecasts(self):
+        """
+        Every _FORECAST_REFRESH_INTERVAL, re-fetch forecasts of locations
+        requested during the last interval. Returns once none were (idle);
+        get_weather starts it again.
+        """
+        while True:
+            await asyncio.sleep(_FORECAST_REFRESH_INTERVAL)
+            cutoff = time.monotonic() - _FORECAST_REFRESH_INTERVAL
+            self._weather_used = {
+                key: used for key, used in self._weather_used.items() if used[0] >= cutoff
+            }
+            if not self._weather_used:
+                return
+            if self._breaker_open("weather"):
+                continue
+            recent = sorted(self._weather_used.items(), key=lambda item: item[1][0])
+            # Through _single_flight, so a user request for the same key shares the fetch
+            await asyncio.gather(
+                *(
+                    self._single_flight(f"weather:{key}", functools.partial(self._fetch_weather, location, key))
+                    for key, (_, location) in recent[-_FORECAST_REFRESH_MAX:]
+                ),
+                return_exceptions=True
+            )
+    
+    def _ensure_refresh(self):
+        """Start the forecast refresh loop unless it is already running"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_forecasts())
+    
+    async def _init_weather_server(self) -> bool:
+        """Weather is always available (Open-Meteo is free)"""
         self.weather_available = True
+        # Warm the geocode cache and Open-Meteo connections in the background;
+        # keep a reference so the task isn't garbage-collected mid-flight
+        self._prewarm_task = asyncio.create_task(self._prewarm())
+        return self.weather_available
+    
+    async def _init_news_server(self) -> bool:
+        """News needs a TheNews API key"""
+        import os
         
-        # Check for news API key
         self.news_api_key = os.getenv('THENEWSAPI_KEY')
         self.news_available = bool(self.news_api_key)
-        
-        return {
-            "weather": self.weather_available,
-            "news": self.news_available
-        }
+        return self.news_available
     
-    async def get_weather(self, location: str) -> Dict[str, Any]:
-        """Get weather data via Open-Meteo API"""
-        if not self.weather_available:
-            return {"error": "Weather service unavailable"}
+    async def initialize_all_servers(self) -> Dict[str, bool]:
+        """Initialize all MCP server connections concurrently"""
+        servers = {
+            "weather": self._init_weather_server,
+            "news": self._init_news_server,
+        }
+        # Startup latency is the slowest server, not the sum of all of them
+        results = await asyncio.gather(*(init() for init in servers.values()), return_exceptions=True)
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                # Geocode location
-                geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={location}&count=1&language=en&format=json"
-                async with session.get(geo_url) as response:
-                    geo_data = await response.json()
-                
-                if not geo_data.get("results"):
-                    return {"error": f"Location '{location}' not found"}
-                
-                lat = geo_data["results"][0]["latitude"]
-                lon = geo_data["results"][0]["longitude"]
-                city_name = geo_data["results"][0]["name"]
-                country = geo_data["results"][0].get("country", "")
-                
-                # Get weather
-                weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m&timezone=auto"
-                async with session.get(weather_url) as response:
-                    weather_data = await response.json()
-                
-                current = weather_data.get("current", {})
-                
-                weather_codes = {
-                    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-                    45: "Foggy", 51: "Light drizzle", 61: "Slight rain", 63: "Moderate rain",
-                    65: "Heavy rain", 71: "Slight snow", 95: "Thunderstorm"
-                }
-                
-                weather_code = current.get("weather_code", 0)
-                condition = weather_codes.get(weather_code, "Unknown")
-                
-                return {import asyncio
-from typing import Dict, Any, Optional
-import aiohttp
-import json
-
-class MCPClient:
-    """
-    Client for interacting with MCP servers
-    Handles weather and news data retrieval
-    """
+        status = {}
+        for name, result in zip(servers, results):
+            if isinstance(result, BaseException):
+                log.warning("%s server init failed: %s", name, result)
+                result = False
+            status[name] = result
+        return status
     
-    def __init__(self):
-        self.weather_available = False
-        self.news_available = False
-        self.news_api_key = None
-        
-    async def initialize_all_servers(self) -> Dict[str, bool]:
-        """Initialize all MCP server connections"""
-        import os
+    async def _fetch_json(self, url: str, params: Dict[str, Any], decoder: msgspec.json.Decoder) -> Any:
+        """GET url and decode the JSON body with decoder; non-2xx responses raise ClientResponseError"""
+        session = await self._get_session()
+        async with self._request_slots:
+            async with session.get(url, params=params) as response:
+                return decoder.decode(await response.read())
+    
+    def _breaker_open(self, name: str) -> bool:
+        """True while the named upstream is in its post-failure cooldown"""
+        return time.monotonic() < self._breakers[name]["open_until"]
+    
+    def _record_result(self, name: str, ok: bool):
+        """Reset the breaker on success; open it after _BREAKER_THRESHOLD failures in a row"""
+        breaker = self._breakers[name]
+        if ok:
+            breaker["failures"] = 0
+            return
+        breaker["failures"] += 1
+        if breaker["failures"] >= _BREAKER_THRESHOLD:
+            breaker["open_until"] = time.monotonic() + _BREAKER_COOLDOWN
+            breaker["failures"] = 0
+            log.warning("%s upstream failing, skipping it for %.0fs", name, _BREAKER_COOLDOWN)
+    
+    async def _single_flight(self, key: str, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run coro_factory() once per key; concurrent callers await the same task"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller being cancelled must not cancel the shared fetch
+        return await asyncio.shield(task)
+    
+    def is_known_location(self, location: str) -> bool:
+        """True for POPULAR_CITIES and names that have already geocoded successfully"""
+        key = location.strip().lower()
+        return key in _POPULAR_KEYS or key in self._geo_cache
+    
+    async def _geocode(self, location: str) -> Optional[_Place]:
+        """Resolve a location name to its first Open-Meteo match (cached)"""
+        key = location.strip().lower()
+        place = self._geo_cache.get(key)
+        if place is not None:
+            return place
         
-        # Weather is always available (Open-Meteo is free)
-        self.weather_available = True
+        geo_params = {"name": location, "count": 1, "language": "en", "format": "json"}
+        geo_data = await self._fetch_json(_GEO_URL, geo_params, _GEO_DECODER)
         
-        # Check for news API key
-        self.news_api_key = os.getenv('THENEWSAPI_KEY')
-        self.news_available = bool(self.news_api_key)
+        if not geo_data.results:
+            return None
         
-        return {
-            "weather": self.weather_available,
-            "news": self.news_available
-        }
+        place = geo_data.results[0]
+        self._geo_cache[key] = place
+        return place
     
     async def get_weather(self, location: str) -> Dict[str, Any]:
         """Get weather data via Open-Meteo API"""
         if not self.weather_available:
             return {"error": "Weather service unavailable"}
         
+        key = location.strip().lower()
+        self._weather_used[key] = (time.monotonic(), location)
+        self._ensure_refresh()
+        
+        cached = self._weather_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if self._breaker_open("weather"):
+            return {"error": "Weather temporarily unavailable"}
+        
+        return await self._single_flight(f"weather:{key}", lambda: self._fetch_weather(location, key))
+    
+    async def _fetch_weather(self, location: str, key: str) -> Dict[str, Any]:
+        """Geocode + forecast request behind get_weather's cache"""
         try:
-            async with aiohttp.ClientSession() as session:
-                # Geocode location
-                geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={location}&count=1&language=en&format=json"
-                async with session.get(geo_url) as response:
-                    geo_data = await response.json()
-                
-                if not geo_data.get("results"):
-                    return {"error": f"Location '{location}' not found"}
-                
-                lat = geo_data["results"][0]["latitude"]
-                lon = geo_data["results"][0]["longitude"]
-                city_name = geo_data["results"][0]["name"]
-                country = geo_data["results"][0].get("country", "")
-                
-                # Get weather
-                weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m&timezone=auto"
-                async with session.get(weather_url) as response:
-                    weather_data = await response.json()
-                
-                current = weather_data.get("current", {})
-                
-                weather_codes = {
-                    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
-                    45: "Foggy", 51: "Light drizzle", 61: "Slight rain", 63: "Moderate rain",
-                    65: "Heavy rain", 71: "Slight snow", 95: "Thunderstorm"
-                }
-                
-                weather_code = current.get("weather_code", 0)
-                condition = weather_codes.get(weather_code, "Unknown")
-                
-                return {
-                    "location": f"{city_name}, {country}",
-                    "temperature": round(current.get("temperature_2m", 0), 1),
-                    "feels_like": round(current.get("apparent_temperature", 0), 1),
-                    "humidity": current.get("relative_humidity_2m", 0),
-                    "wind_speed": round(current.get("wind_speed_10m", 0), 1),
-                    "condition": condition,
-                    "precipitation": current.get("precipitation", 0)
-                }
-                
-        except Exception as e:
+            place = await self._geocode(location)
+            if place is None:
+                return {"error": f"Location '{location}' not found"}
+            
+            # Get weather
+            weather_params = {"latitude": place.latitude, "longitude": place.longitude, "current": _FORECAST_FIELDS, "timezone": "auto"}
+            forecast = await self._fetch_json(_FORECAST_URL, weather_params, _FORECAST_DECODER)
+            self._record_result("weather", ok=True)
+            
+            current = forecast.current
+            
+            weather = {
+                "location": f"{place.name}, {place.country}",
+                "temperature": round(current.temperature_2m, 1),
+                "feels_like": round(current.apparent_temperature, 1),
+                "humidity": current.relative_humidity_2m,
+                "wind_speed": round(current.wind_speed_10m, 1),
+                "condition": _WEATHER_CODES.get(current.weather_code, "Unknown"),
+                "precipitation": current.precipitation
+            }
+            self._weather_cache[key] = weather
+            return weather
+            
+        except _FETCH_ERRORS as e:
+            self._record_result("weather", ok=False)
+            log.warning("weather fetch failed: %s", e)
             return {"error": f"Weather fetch failed: {str(e)}"}
     
     async def get_news(self, topic: Optional[str] = None) -> Dict[str, Any]:
@@ -155,78 +344,49 @@ class MCPClient:
                 "note": "Please set THENEWSAPI_KEY environment variable"
             }
         
-        try:
-            async with aiohttp.ClientSession() as session:
-                if topic and topic != "general":
-                    url = f"https://api.thenewsapi.com/v1/news/all?api_token={self.news_api_key}&search={topic}&limit=5&language=en"
-                else:
-                    url = f"https://api.thenewsapi.com/v1/news/top?api_token={self.news_api_key}&limit=5&language=en"
-                
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return {"error": f"News API returned status {response.status}"}
-                    
-                    data = await response.json()
-                    articles = []
-                    
-                    for item in data.get("data", [])[:5]:
-                        articles.append({
-                            "title": item.get("title", "No title"),
-                            "description": item.get("description", "No description"),
-                            "url": item.get("url", ""),
-                            "published_at": item.get("published_at", ""),
-                            "source": item.get("source", "Unknown")
-                        })
-                    
-                    return {"articles": articles, "total": len(articles)}
-                    
-        except Exception as e:
-            return {"error": f"News fetch failed: {str(e)}"}
-
-                    "location": f"{city_name}, {country}",
-                    "temperature": round(current.get("temperature_2m", 0), 1),
-                    "feels_like": round(current.get("apparent_temperature", 0), 1),
-                    "humidity": current.get("relative_humidity_2m", 0),
-                    "wind_speed": round(current.get("wind_speed_10m", 0), 1),
-                    "condition": condition,
-                    "precipitation": current.get("precipitation", 0)
-                }
-                
-        except Exception as e:
-            return {"error": f"Weather fetch failed: {str(e)}"}
+        key = (topic or "general").strip().lower()
+        cached = self._news_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if self._breaker_open("news"):
+            return {"error": "News temporarily unavailable"}
+        
+        return await self._single_flight(f"news:{key}", lambda: self._fetch_news(topic, key))
     
-    async def get_news(self, topic: Optional[str] = None) -> Dict[str, Any]:
-        """Get news data via TheNews API"""
-        if not self.news_available:
-            return {
-                "error": "News service unavailable",
-                "note": "Please set THENEWSAPI_KEY environment variable"
-            }
+    async def _fetch_news(self, topic: Optional[str], key: str) -> Dict[str, Any]:
+        """News request behind get_news's cache"""
+        params = {"api_token": self.news_api_key, "limit": 5, "language": "en"}
+        if topic and topic != "general":
+            url = _NEWS_ALL_URL
+            params["search"] = topic
+        else:
+            url = _NEWS_TOP_URL
         
         try:
-            async with aiohttp.ClientSession() as session:
-                if topic and topic != "general":
-                    url = f"https://api.thenewsapi.com/v1/news/all?api_token={self.news_api_key}&search={topic}&limit=5&language=en"
-                else:
-                    url = f"https://api.thenewsapi.com/v1/news/top?api_token={self.news_api_key}&limit=5&language=en"
-                
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return {"error": f"News API returned status {response.status}"}
-                    
-                    data = await response.json()
-                    articles = []
-                    
-                    for item in data.get("data", [])[:5]:
-                        articles.append({
-                            "title": item.get("title", "No title"),
-                            "description": item.get("description", "No description"),
-                            "url": item.get("url", ""),
-                            "published_at": item.get("published_at", ""),
-                            "source": item.get("source", "Unknown")
-                        })
-                    
-                    return {"articles": articles, "total": len(articles)}
-                    
-        except Exception as e:
+            page = await self._fetch_json(url, params, _NEWS_DECODER)
+        except aiohttp.ClientResponseError as e:
+            self._record_result("news", ok=False)
+            log.warning("news API returned status %s", e.status)
+            return {"error": f"News API returned status {e.status}"}
+        except _FETCH_ERRORS as e:
+            self._record_result("news", ok=False)
+            log.warning("news fetch failed: %s", e)
             return {"error": f"News fetch failed: {str(e)}"}
+        self._record_result("news", ok=True)
+        
+        # limit=5 is enforced server-side; islice only guards against a larger page
+        articles = [
+            {
+                "title": item.title or "No title",
+                "description": item.description or "No description",
+                "url": item.url or "",
+                "published_at": item.published_at or "",
+                "source": item.source or "Unknown"
+            }
+            for item in islice(page.data, 5)
+        ]
+        
+        news = {"articles": articles, "total": len(articles)}
+        self._news_cache[key] = news
+        return news
@@ -1,10 +1,22 @@
 import asyncio
-from typing import Dict, Any, List, Optional
-from openai import OpenAI
-import json
+import logging
+import queue
+import threading
+from typing import Dict, Any, List, Optional, AsyncIterator, Iterator
+from openai import AsyncOpenAI
 from .intent_classifier import IntentClassifier
 from .mcp_client import MCPClient
 
+log = logging.getLogger(__name__)
+
+# Turns sent to the LLM for general conversation
+MAX_CONTEXT_MESSAGES = 16
+
+GREETING_RESPONSE = "Hi! Ask me about the weather or the latest news anywhere in the world."
+
+# How long a retired orchestrator keeps serving turns already in progress
+RETIRE_GRACE_SECONDS = 60.0
+
 class AgentOrchestrator:
     """
     Main orchestrator that coordinates between intent classification,
@@ -12,29 +24,70 @@ class AgentOrchestrator:
     """
     
     def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+        self.aclient = AsyncOpenAI(api_key=api_key)
         self.model = "gpt-4o-mini"
-        self.intent_classifier = IntentClassifier(api_key)
         self.mcp_client = MCPClient()
-        self.conversation_context = []
+        # Regex-only intents are limited to places the MCP client already knows
+        self.intent_classifier = IntentClassifier(api_key, self.mcp_client.is_known_location)
+        
+        # One event loop for the orchestrator's lifetime, so the MCP client's
+        # connection pool, DNS cache and keep-alives survive across turns
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        # Set by retire(); holders should stop using this instance
+        self.retired = False
+    
+    def _run(self, coro):
+        """Run a coroutine on the background loop and wait for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
         
     def initialize_mcp_servers(self) -> Dict[str, bool]:
         """Initialize all MCP servers and return their status"""
         try:
-            status = asyncio.run(self.mcp_client.initialize_all_servers())
+            status = self._run(self.mcp_client.initialize_all_servers())
             return status
-        except Exception as e:
-            print(f"Error initializing MCP servers: {e}")
+        except Exception:
+            log.exception("MCP server init failed")
             return {"weather": False, "news": False}
     
-    def process_query(self, messages: List[Dict], current_query: str) -> Dict[str, Any]:
+    def close(self):
+        """Release the MCP client's pooled HTTP connections and stop the loop"""
+        if self._loop.is_closed():
+            return
+        try:
+            self._run(self.mcp_client.aclose())
+        except Exception:
+            log.exception("Closing MCP client failed")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+        self._loop.close()
+    
+    def retire(self, grace: float = RETIRE_GRACE_SECONDS):
+        """
+        Stop background work now and close() after grace seconds, so turns
+        other sessions are still running on this shared instance can finish
+        """
+        if self.retired or self._loop.is_closed():
+            return
+        self.retired = True
+        self._loop.call_soon_threadsafe(self.mcp_client.stop_background)
+        timer = threading.Timer(grace, self.close)
+        timer.daemon = True
+        timer.start()
+    
+    def process_query(self, messages: List[Dict], current_query: str, model: Optional[str] = None) -> Dict[str, Any]:
         """
         Main processing pipeline:
         1. Classify intent
         2. Route to appropriate MCP servers
         3. Aggregate results
         4. Generate natural response
+        model overrides self.model for this call only (the instance may be shared)
         """
+        if self.intent_classifier.is_greeting(current_query):
+            return self._greeting_response()
+        
         try:
             # Step 1: Classify intent
             intent = self.intent_classifier.classify(current_query)
@@ -42,27 +95,13 @@ class AgentOrchestrator:
             # Step 2: Route to MCP servers based on intent
             results = {"intent": intent}
             
-            # Handle weather requests
-            if intent["weather"]["needed"]:
-                location = intent["weather"]["location"]
-                if location:
-                    weather_data = asyncio.run(
-                        self.mcp_client.get_weather(location)
-                    )
-                    results["weather"] = weather_data
-            
-            # Handle news requests
-            if intent["news"]["needed"]:
-                topic = intent["news"]["topic"]
-                news_data = asyncio.run(
-                    self.mcp_client.get_news(topic)
-                )
-                results["news"] = news_data
+            # Weather and news are independent, so fetch them concurrently
+            results.update(self._run(self._fetch_mcp_data(intent)))
             
             # Step 3: Generate natural language response
             if not intent["weather"]["needed"] and not intent["news"]["needed"]:
                 # General conversation
-                results["text"] = self._generate_general_response(messages, current_query)
+                results["text"] = self._generate_general_response(messages, current_query, model)
             else:
                 # Generate contextual response with data
                 results["text"] = self._generate_contextual_response(results, current_query)
@@ -72,24 +111,136 @@ class AgentOrchestrator:
         except Exception as e:
             return {"error": str(e), "text": f"I encountered an error: {str(e)}"}
     
-    def _generate_general_response(self, messages: List[Dict], query: str) -> str:
-        """Generate response for general queries not needing MCP"""
+    def process_query_stream(
+        self,
+        messages: List[Dict],
+        current_query: str,
+        results: Dict[str, Any],
+        model: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Same pipeline as process_query, but yields the response text as it is
+        generated. results is filled in place: intent and MCP data before the
+        first token, text once the stream is done (error on failure).
+        """
+        if self.intent_classifier.is_greeting(current_query):
+            results.update(self._greeting_response())
+            yield results["text"]
+            return
+        
         try:
-            # Filter messages for API
-            api_messages = [
-                {"role": msg["role"], "content": msg["content"]}
-                for msg in messages
-                if msg["role"] in ["user", "assistant"] and isinstance(msg.get("content"), str)
-            ]
+            intent = self.intent_classifier.classify(current_query)
+            results["intent"] = intent
+            results.update(self._run(self._fetch_mcp_data(intent)))
+            
+            if intent["weather"]["needed"] or intent["news"]["needed"]:
+                text = self._generate_contextual_response(results, current_query)
+                yield text
+            else:
+                parts = []
+                for token in self.stream_general_response(messages, model):
+                    parts.append(token)
+                    yield token
+                text = "".join(parts)
+            
+            results["text"] = text
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=api_messages,
-                max_tokens=500
-            )
-            return response.choices[0].message.content
         except Exception as e:
-            return f"I'm having trouble processing that. Could you rephrase your question?"
+            results["error"] = str(e)
+            results["text"] = f"I encountered an error: {str(e)}"
+            yield results["text"]
+    
+    def _greeting_response(self) -> Dict[str, Any]:
+        """Canned reply for greetings; skips MCP and the LLM entirely"""
+        return {"intent": self.intent_classifier._default_intent(), "text": GREETING_RESPONSE}
+    
+    async def _fetch_mcp_data(self, intent: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the weather and news calls the intent asks for with asyncio.gather"""
+        keys, coros = [], []
+        
+        if intent["weather"]["needed"]:
+            location = intent["weather"]["location"]
+            if location:
+                keys.append("weather")
+                coros.append(self.mcp_client.get_weather(location))
+        
+        if intent["news"]["needed"]:
+            keys.append("news")
+            coros.append(self.mcp_client.get_news(intent["news"]["topic"]))
+        
+        if not coros:
+            return {}
+        # One failing tool must not discard the other's result
+        results = await asyncio.gather(*coros, return_exceptions=True)
+        return {
+            key: {"error": str(result)} if isinstance(result, Exception) else result
+            for key, result in zip(keys, results)
+        }
+    
+    def _build_context(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Return the last MAX_CONTEXT_MESSAGES chat turns for the API.
+        Scans from the end, so the cost stays bounded as history grows, and
+        keeps no per-conversation state, so one orchestrator can serve many sessions.
+        """
+        context = []
+        for msg in reversed(messages):
+            if msg.get("role") not in ("user", "assistant"):
+                continue
+            # Assistant turns may carry only structured data, with the text inside it
+            content = msg.get("content")
+            if content is None and isinstance(msg.get("data"), dict):
+                content = msg["data"].get("text")
+            if isinstance(content, str):
+                context.append({"role": msg["role"], "content": content})
+                if len(context) == MAX_CONTEXT_MESSAGES:
+                    break
+        context.reverse()
+        return context
+    
+    async def _astream_general_response(self, api_messages: List[Dict], model: Optional[str] = None) -> AsyncIterator[str]:
+        """Stream completion tokens for a general (non-MCP) conversation turn"""
+        stream = await self.aclient.chat.completions.create(
+            model=model or self.model,
+            messages=api_messages,
+            max_tokens=500,
+            stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def stream_general_response(self, messages: List[Dict], model: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield tokens of a general response as they arrive.
+        The request runs on the background loop; tokens are handed over
+        through a thread-safe queue so sync callers can render incrementally.
+        """
+        api_messages = self._build_context(messages)
+        tokens: queue.Queue = queue.Queue()
+        done = object()
+        
+        async def pump():
+            try:
+                async for token in self._astream_general_response(api_messages, model):
+                    tokens.put(token)
+            except Exception as e:
+                tokens.put(e)
+            finally:
+                tokens.put(done)
+        
+        asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        while (item := tokens.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    
+    def _generate_general_response(self, messages: List[Dict], query: str, model: Optional[str] = None) -> str:
+        """Generate response for general queries not needing MCP"""
+        try:
+            return "".join(self.stream_general_response(messages, model))
+        except Exception:
+            return "I'm having trouble processing that. Could you rephrase your question?"
     
     def _generate_contextual_response(self, results: Dict, query: str) -> str:
         """Generate natural response incorporating MCP results"""
@@ -0,0 +1,98 @@
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from openai import OpenAI
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", prompt.lower())).strip()
+
+
+class SemanticCache:
+    """
+    Response cache keyed by prompt meaning rather than exact text.
+    Embeddings live in one preallocated float32 matrix, so a lookup is a
+    single matrix-vector product; the least recently used entry is evicted
+    when the cache is full. Entries older than ttl seconds never match and
+    their slots are freed on the next lookup.
+    """
+
+    def __init__(self, max_entries: int = 500, threshold: float = 0.9, ttl: float = 1800):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self._vectors = np.zeros((max_entries, EMBEDDING_DIM), dtype=np.float32)
+        self._entries: List[Optional[Tuple[str, str, Dict[str, Any]]]] = [None] * max_entries
+        self._last_used = np.full(max_entries, -1, dtype=np.int64)
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        # Model of each slot, so model filtering is one vectorized comparison
+        self._models = np.full(max_entries, "", dtype=object)
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def embed(self, client: OpenAI, prompt: str) -> np.ndarray:
+        """Embed the normalized prompt as a unit float32 vector"""
+        response = client.embeddings.create(model=EMBEDDING_MODEL, input=normalize_prompt(prompt))
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def get(self, vector: np.ndarray, model: str) -> Optional[Dict[str, Any]]:
+        """Return the stored response of the most similar prompt for this model, if close enough"""
+        with self._lock:
+            occupied = self._last_used >= 0
+            expired = occupied & (time.monotonic() - self._created > self.ttl)
+            if expired.any():
+                self._free(expired)
+            
+            scores = self._vectors @ vector
+            # Empty slots, expired entries and other models' entries can't match
+            valid = occupied & ~expired & (self._models == model)
+            scores[~valid] = -1.0
+
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._entries[best][2]
+
+    def put(self, vector: np.ndarray, prompt: str, model: str, response_data: Dict[str, Any]):
+        """Store a response, evicting the least recently used entry if full"""
+        with self._lock:
+            slot = int(np.argmin(self._last_used))
+            self._clock += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = (prompt, model, response_data)
+            self._models[slot] = model
+            self._last_used[slot] = self._clock
+            self._created[slot] = time.monotonic()
+
+    def _free(self, mask: np.ndarray):
+        """Empty the masked slots; they are then the first candidates for put()"""
+        self._vectors[mask] = 0.0
+        self._models[mask] = ""
+        self._last_used[mask] = -1
+        for slot in np.flatnonzero(mask):
+            self._entries[slot] = None
+
+    def clear(self):
+        with self._lock:
+            self._vectors[:] = 0.0
+            self._entries = [None] * self.max_entries
+            self._last_used[:] = -1
+            self._created[:] = 0.0
+            self._models[:] = ""
+
+    def __len__(self) -> int:
+        return int((self._last_used >= 0).sum())
@@ -1,16 +1,20 @@
 import streamlit as st
+import functools
+import html
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from agents.orchestrator import AgentOrchestrator
-from agents.intent_classifier import IntentClassifier
+from cache import SQLiteCache, make_key
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# The agents pull in the OpenAI SDK, aiohttp and numpy; they are imported
+# on first use so the page renders before anyone clicks Initialize
+if TYPE_CHECKING:
+    from agents.semantic_cache import SemanticCache
 
 # Page config
 st.set_page_config(
@@ -20,69 +24,29 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource(show_spinner=False)
+def _load_env() -> bool:
+    """Read .env once per process, not on every rerun"""
+    from dotenv import load_dotenv
+    
+    load_dotenv()
+    return True
+
+_load_env()
+
+@st.cache_data
+def _load_css() -> str:
+    """Read the stylesheet once; reruns get the same cached string"""
+    return f"<style>{(Path(__file__).parent / 'assets' / 'styles.css').read_text()}</style>"
+
 # Custom CSS
-st.markdown("""
-<style>
-    .stChatMessage {
-        padding: 1rem;
-        border-radius: 0.5rem;
-    }
-    .weather-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 1.5rem;
-        border-radius: 1rem;
-        color: white;
-        margin: 1rem 0;
-    }
-    .news-card {
-        background: white;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #667eea;
-        margin: 0.5rem 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    .metric-container {
-        display: flex;
-        gap: 1rem;
-        margin-top: 1rem;
-    }
-    .metric-box {
-        flex: 1;
-        text-align: center;
-        padding: 0.5rem;
-        background: rgba(255,255,255,0.2);
-        border-radius: 0.5rem;
-    }
-    .news-title {
-        margin: 0 0 0.5rem 0;
-        color: #333;
-        font-size: 1.1rem;
-        font-weight: 600;
-    }
-    .news-desc {
-        color: #666;
-        margin: 0.5rem 0;
-        font-size: 0.9rem;
-        line-height: 1.5;
-    }
-    .news-meta {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-top: 0.5rem;
-    }
-    .news-source {
-        font-size: 0.8rem;
-        color: #999;
-    }
-    .news-link {
-        color: #667eea;
-        text-decoration: none;
-        font-size: 0.9rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(_load_css(), unsafe_allow_html=True)
+
+# Messages re-rendered on every rerun; older ones are shown on demand
+MAX_RENDERED_MESSAGES = 50
+
+# Lifetime of cached responses, in both the SQLite and the semantic cache
+RESPONSE_TTL = 1800  # seconds
 
 # Initialize session state
 if "messages" not in st.session_state:
@@ -91,8 +55,84 @@ if "orchestrator" not in st.session_state:
     st.session_state.orchestrator = None
 if "mcp_status" not in st.session_state:
     st.session_state.mcp_status = {"weather": False, "news": False}
-if "cache" not in st.session_state:
-    st.session_state.cache = {}
+# Reconnect in another session retired the shared orchestrator; re-initialize
+if st.session_state.orchestrator is not None and st.session_state.orchestrator.retired:
+    st.session_state.orchestrator = None
+
+@st.cache_resource
+def get_response_db() -> SQLiteCache:
+    """Persistent response cache; survives app restarts"""
+    return SQLiteCache(str(Path(__file__).parent / "cache.db"), ttl=RESPONSE_TTL)
+
+@st.cache_resource
+def get_semantic_cache() -> "SemanticCache":
+    """One semantic cache shared by all sessions"""
+    from agents.semantic_cache import SemanticCache
+    
+    # Same lifetime as the SQLite response cache
+    return SemanticCache(max_entries=500, threshold=0.9, ttl=RESPONSE_TTL)
+
+def _is_tool_response(response_data: dict) -> bool:
+    """
+    True when the reply came from weather/news data. Those replies depend only
+    on the prompt; general replies depend on the session's chat history and
+    must never be served to another session.
+    """
+    intent = response_data.get("intent") or {}
+    return any(intent.get(tool, {}).get("needed") for tool in ("weather", "news"))
+
+def lookup_cached_response(prompt: str, model: str):
+    """
+    Look a prompt up in the semantic cache (near-duplicates such as
+    "Weather in Tokyo" / "tokyo weather"), then in the exact-key SQLite cache.
+    Returns (response_data or None, prompt embedding or None)
+    """
+    classifier = st.session_state.orchestrator.intent_classifier
+    # Greetings are answered with no API call at all; don't add an embedding call
+    if classifier.is_greeting(prompt):
+        return None, None
+    
+    # Regex-classified prompts need no LLM either, so only the exact-key cache
+    # is checked; the embedding request is kept for prompts bound for the LLM
+    vector = None
+    if classifier.fast_intent(prompt) is None:
+        semantic_cache = get_semantic_cache()
+        try:
+            vector = semantic_cache.embed(classifier.client, prompt)
+        except Exception:
+            vector = None
+        
+        if vector is not None:
+            cached = semantic_cache.get(vector, model)
+            if cached is not None and _is_tool_response(cached):
+                return cached, vector
+    
+    cached = get_response_db().get(make_key(prompt, model))
+    if cached is not None and not _is_tool_response(cached):
+        cached = None
+    return cached, vector
+
+def store_response(prompt: str, model: str, vector, response_data: dict):
+    """Cache a completed, successful weather/news response in both caches"""
+    if "error" in response_data:
+        return
+    if not _is_tool_response(response_data):
+        return
+    get_response_db().set(make_key(prompt, model), response_data)
+    if vector is not None:
+        get_semantic_cache().put(vector, prompt, model, response_data)
+
+@st.cache_resource(show_spinner=False)
+def get_orchestrator(api_key: str):
+    """
+    Build one orchestrator per API key for the whole process, so sessions
+    share its MCP connections instead of re-initializing them
+    """
+    from agents.orchestrator import AgentOrchestrator
+    
+    orchestrator = AgentOrchestrator(api_key)
+    status = orchestrator.initialize_mcp_servers()
+    return orchestrator, status
 
 def initialize_orchestrator(api_key: str):
     """Initialize the agent orchestrator with MCP servers"""
@@ -100,36 +140,76 @@ def initialize_orchestrator(api_key: str):
         return False, "API key is required"
     
     try:
-        orchestrator = AgentOrchestrator(api_key)
-        status = orchestrator.initialize_mcp_servers()
+        orchestrator, status = get_orchestrator(api_key)
         
         st.session_state.orchestrator = orchestrator
+        st.session_state.orchestrator_key = api_key
         st.session_state.mcp_status = status
         
         return True, "Orchestrator initialized successfully"
     except Exception as e:
         return False, f"Failed to initialize: {str(e)}"
 
+@st.cache_data(max_entries=1000, show_spinner=False)
+def _weather_html(location, temperature, condition, feels_like, humidity, wind_speed, precipitation) -> str:
+    """Build the whole weather card as one HTML string"""
+    metrics = (
+        ("Feels Like", f"{feels_like}°C"),
+        ("Humidity", f"{humidity}%"),
+        ("Wind Speed", f"{wind_speed} km/h"),
+        ("Precipitation", f"{precipitation} mm"),
+    )
+    boxes = "".join(
+        f'<div class="metric-box">{label}<br><strong>{html.escape(str(value))}</strong></div>'
+        for label, value in metrics
+    )
+    return (
+        '<div class="weather-card">'
+        f'<h3>🌤️ {html.escape(str(location))}</h3>'
+        f'<h1>{html.escape(str(temperature))}°C</h1>'
+        f'<strong>{html.escape(str(condition))}</strong>'
+        f'<div class="metric-container">{boxes}</div>'
+        '</div>'
+    )
+
 def render_weather_card(weather_data: dict):
     """Render weather data as a nice card"""
     if "error" in weather_data:
         st.error(f"❌ {weather_data['error']}")
         return
     
-    col1, col2, col3 = st.columns([2, 1, 1])
-    
-    with col1:
-        st.markdown(f"### 🌤️ {weather_data.get('location', 'Unknown')}")
-        st.markdown(f"# {weather_data.get('temperature', 'N/A')}°C")
-        st.markdown(f"**{weather_data.get('condition', 'Unknown')}**")
-    
-    with col2:
-        st.metric("Feels Like", f"{weather_data.get('feels_like', 'N/A')}°C")
-        st.metric("Humidity", f"{weather_data.get('humidity', 'N/A')}%")
-    
-    with col3:
-        st.metric("Wind Speed", f"{weather_data.get('wind_speed', 'N/A')} km/h")
-        st.metric("Precipitation", f"{weather_data.get('precipitation', 0)} mm")
+    st.markdown(_weather_html(
+        weather_data.get('location', 'Unknown'),
+        weather_data.get('temperature', 'N/A'),
+        weather_data.get('condition', 'Unknown'),
+        weather_data.get('feels_like', 'N/A'),
+        weather_data.get('humidity', 'N/A'),
+        weather_data.get('wind_speed', 'N/A'),
+        weather_data.get('precipitation', 0)
+    ), unsafe_allow_html=True)
+
+@functools.lru_cache(maxsize=1024)
+def _trunc(s: str, n: int = 250) -> str:
+    """Shorten s to n characters, marking the cut with an ellipsis"""
+    return s[:n] + ("..." if len(s) > n else "")
+
+@st.cache_data(max_entries=1000, show_spinner=False)
+def _news_html(articles: tuple) -> str:
+    """Build all news cards as one HTML string; articles is a tuple of (url, title, description, source)"""
+    cards = []
+    for idx, (url, title, description, source) in enumerate(articles, 1):
+        link = (
+            f'<a class="news-link" href="{html.escape(url)}" target="_blank">Read more →</a>'
+            if url else ""
+        )
+        cards.append(
+            '<div class="news-card">'
+            f'<p class="news-title">{idx}. {html.escape(title)}</p>'
+            f'<p class="news-desc">{html.escape(_trunc(description))}</p>'
+            f'<div class="news-meta"><span class="news-source">📍 {html.escape(source)}</span>{link}</div>'
+            '</div>'
+        )
+    return "".join(cards)
 
 def render_news_articles(news_data: dict):
     """Render news articles"""
@@ -146,36 +226,57 @@ def render_news_articles(news_data: dict):
     
     st.markdown(f"### 📰 Latest News ({news_data.get('total', len(articles))} articles)")
     
-    for idx, article in enumerate(articles[:5], 1):
-        with st.container():
-            st.markdown(f"**{idx}. {article.get('title', 'No title')}**")
-            st.markdown(f"{article.get('description', 'No description available')[:250]}...")
+    # One cached HTML block instead of several widgets per article
+    st.markdown(_news_html(tuple(
+        (
+            article.get('url') or "",
+            article.get('title', 'No title'),
+            article.get('description', 'No description available'),
+            article.get('source', 'Unknown')
+        )
+        for article in articles[:5]
+    )), unsafe_allow_html=True)
+
+def render_message(message: dict):
+    """Render one chat history entry"""
+    with st.chat_message(message["role"]):
+        if message["role"] == "assistant":
+            # Render structured response
+            data = message["data"]
+            
+            if data.get("weather"):
+                render_weather_card(data["weather"])
             
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.caption(f"📍 {article.get('source', 'Unknown')}")
-            with col2:
-                if article.get('url'):
-                    st.markdown(f"[Read more →]({article['url']})")
+            if data.get("news"):
+                render_news_articles(data["news"])
             
-            st.divider()
+            if data.get("text"):
+                st.markdown(data["text"])
+            
+            if data.get("error"):
+                st.error(data["error"])
+        else:
+            st.markdown(message["content"])
 
-# Sidebar
-with st.sidebar:
+# Sidebar; a fragment, so its widgets rerun only the sidebar
+@st.fragment
+def sidebar_panel():
     st.header("⚙️ Configuration")
     
     api_key = st.text_input(
         "OpenAI API Key",
         type="password",
         value=os.environ.get("OPENAI_API_KEY", ""),
-        help="Enter your OpenAI API key"
+        help="Enter your OpenAI API key",
+        key="api_key"
     )
     
     model = st.selectbox(
         "Model",
         ["gpt-4o-mini", "gpt-4-turbo", "gpt-4", "gpt-3.5-turbo"],
         index=0,
-        help="Select the GPT model to use"
+        help="Select the GPT model to use",
+        key="model"
     )
     
     st.markdown("---")
@@ -202,6 +303,10 @@ with st.sidebar:
             st.metric("News", news_status)
         
         if st.button("🔄 Reconnect", use_container_width=True):
+            # Other sessions may be mid-turn on the shared orchestrator: stop its
+            # background refreshes now and close it after a grace period
+            get_orchestrator.clear(st.session_state.orchestrator_key)
+            st.session_state.orchestrator.retire()
             st.session_state.orchestrator = None
             st.rerun()
     
@@ -219,6 +324,8 @@ with st.sidebar:
         "Hello!"
     ]
     
+    # A click only reruns this fragment, so rerun the app for the chat
+    # panel to pick the query up
     for query in examples:
         if st.button(query, key=f"ex_{query}", use_container_width=True):
             st.session_state.example_query = query
@@ -228,11 +335,13 @@ with st.sidebar:
     
     # Cache management
     st.subheader("💾 Cache")
-    cache_size = len(st.session_state.cache)
-    st.metric("Cached Responses", cache_size)
+    st.caption(f"Responses are cached for {RESPONSE_TTL // 60} minutes")
+    if st.session_state.orchestrator is not None:
+        st.metric("Similar-prompt Cache", len(get_semantic_cache()))
     
-    if cache_size > 0 and st.button("Clear Cache", use_container_width=True):
-        st.session_state.cache = {}
+    if st.button("Clear Cache", use_container_width=True):
+        get_response_db().clear()
+        get_semantic_cache().clear()
         st.success("Cache cleared!")
     
     st.markdown("---")
@@ -245,103 +354,106 @@ with st.sidebar:
     st.caption(f"**Model:** {model}")
     st.caption("**Powered by:** OpenAI + MCP")
 
+with st.sidebar:
+    sidebar_panel()
+
 # Main content
 st.title("🤖 Intelligent Weather & News Agent")
 st.markdown("Ask me about weather, news, or anything else!")
 
-# Check if orchestrator is initialized
-if st.session_state.orchestrator is None:
-    st.info("👈 Please initialize the MCP servers from the sidebar to get started.")
-    st.markdown("### Quick Start:")
-    st.markdown("1. Enter your OpenAI API key in the sidebar")
-    st.markdown("2. Click '🚀 Initialize MCP Servers'")
-    st.markdown("3. Start asking questions!")
-else:
-    # Display conversation history
-    for message in st.session_state.messages:
-        with st.chat_message(message["role"]):
-            if message["role"] == "assistant":
-                # Render structured response
-                if isinstance(message.get("data"), dict):
-                    data = message["data"]
-                    
-                    if data.get("weather"):
-                        render_weather_card(data["weather"])
-                    
-                    if data.get("news"):
-                        render_news_articles(data["news"])
-                    
-                    if data.get("text"):
-                        st.markdown(data["text"])
-                    
-                    if data.get("error"):
-                        st.error(data["error"])
-                else:
-                    st.markdown(message["content"])
-            else:
-                st.markdown(message["content"])
+# Chat area; a fragment, so sending a message doesn't rerun the sidebar
+@st.fragment
+def chat_panel():
+    model = st.session_state.model
     
-    # Handle example query
-    if "example_query" in st.session_state:
-        prompt = st.session_state.example_query
-        del st.session_state.example_query
+    # Check if orchestrator is initialized
+    if st.session_state.orchestrator is None:
+        st.info("👈 Please initialize the MCP servers from the sidebar to get started.")
+        st.markdown("### Quick Start:")
+        st.markdown("1. Enter your OpenAI API key in the sidebar")
+        st.markdown("2. Click '🚀 Initialize MCP Servers'")
+        st.markdown("3. Start asking questions!")
     else:
-        prompt = st.chat_input("💬 Type your question here... (e.g., 'What's happening in London today?')")
+        # Display conversation history; only the latest window is rendered by
+        # default so rerun cost doesn't grow with the conversation
+        messages = st.session_state.messages
+        older_count = len(messages) - MAX_RENDERED_MESSAGES
+        if older_count > 0 and st.toggle(f"Show older {older_count} messages"):
+            for message in messages[:older_count]:
+                render_message(message)
+    
+        for message in messages[-MAX_RENDERED_MESSAGES:]:
+            render_message(message)
+    
+        # Handle example query
+        if "example_query" in st.session_state:
+            prompt = st.session_state.example_query
+            del st.session_state.example_query
+        else:
+            prompt = st.chat_input("💬 Type your question here... (e.g., 'What's happening in London today?')")
     
-    if prompt:
-        # Add user message
-        st.session_state.messages.append({"role": "user", "content": prompt})
-        with st.chat_message("user"):
-            st.markdown(prompt)
+        if prompt:
+            # Add user message
+            st.session_state.messages.append({"role": "user", "content": prompt})
+            with st.chat_message("user"):
+                st.markdown(prompt)
         
-        # Process with orchestrator
-        with st.chat_message("assistant"):
-            with st.spinner("🤔 Thinking..."):
+            # Process with orchestrator
+            with st.chat_message("assistant"):
                 try:
-                    orchestrator = st.session_state.orchestrator
-                    orchestrator.model = model
+                    # Served from cache for similar or repeated prompts
+                    with st.spinner("🤔 Thinking..."):
+                        response_data, vector = lookup_cached_response(prompt, model)
+                
+                    if response_data is not None:
+                        if response_data.get("weather"):
+                            render_weather_card(response_data["weather"])
                     
-                    # Check cache first
-                    cache_key = f"{prompt}_{model}"
-                    if cache_key in st.session_state.cache:
-                        response_data = st.session_state.cache[cache_key]
-                        st.info("📦 Using cached response")
+                        if response_data.get("news"):
+                            render_news_articles(response_data["news"])
+                    
+                        if response_data.get("text"):
+                            st.markdown(response_data["text"])
                     else:
-                        # Process query
-                        response_data = orchestrator.process_query(
+                        # Cards go above the text but are only known once the stream starts
+                        cards = st.container()
+                        response_data = {}
+                        st.write_stream(st.session_state.orchestrator.process_query_stream(
                             st.session_state.messages,
-                            prompt
-                        )
-                        st.session_state.cache[cache_key] = response_data
-                    
-                    # Render response
-                    if response_data.get("weather"):
-                        render_weather_card(response_data["weather"])
-                    
-                    if response_data.get("news"):
-                        render_news_articles(response_data["news"])
+                            prompt,
+                            response_data,
+                            model
+                        ))
                     
-                    if response_data.get("text"):
-                        st.markdown(response_data["text"])
+                        with cards:
+                            if response_data.get("weather"):
+                                render_weather_card(response_data["weather"])
+                        
+                            if response_data.get("news"):
+                                render_news_articles(response_data["news"])
                     
+                        # Only completed responses are cached
+                        store_response(prompt, model, vector, response_data)
+                
                     if response_data.get("error"):
                         st.error(response_data["error"])
-                    
-                    # Store structured data
+                
+                    # Store structured data; its "text" is the message content
                     st.session_state.messages.append({
                         "role": "assistant",
-                        "content": response_data.get("text", ""),
                         "data": response_data
                     })
-                    
+                
                 except Exception as e:
                     error_msg = f"❌ Error: {str(e)}"
                     st.error(error_msg)
                     st.session_state.messages.append({
                         "role": "assistant",
-                        "content": error_msg
+                        "data": {"error": error_msg}
                     })
 
+chat_panel()
+
 # Footer
 st.markdown("---")
 col1, col2, col3 = st.columns(3)
@@ -0,0 +1,57 @@
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+
+def make_key(prompt: str, model: str) -> str:
+    """
+    Stable cache key for a (prompt, model) pair. Only for replies that don't
+    depend on chat history (weather/news results), since the cache is shared.
+    """
+    return hashlib.sha256(f"{prompt}|{model}".encode("utf-8")).hexdigest()
+
+
+class SQLiteCache:
+    """
+    Response cache persisted in SQLite, so hits survive app restarts.
+    Entries older than ttl seconds are treated as missing and deleted on lookup.
+    """
+
+    def __init__(self, path: str = "cache.db", ttl: float = 1800):
+        self.ttl = ttl
+        # Streamlit runs sessions on separate threads; one connection guarded by a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, value BLOB, created_at REAL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[1] > self.ttl:
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                (key, blob, time.time()),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
@@ -0,0 +1,58 @@
+import pytest
+from agents.intent_classifier import _fast_intent
+
+# Stand-in for MCPClient.is_known_location: popular cities plus geocoded names
+KNOWN_LOCATIONS = {"tokyo", "new york", "paris", "london"}
+
+def is_known(location):
+    return location.lower() in KNOWN_LOCATIONS
+
+# These must fall through to the LLM classifier, not yield a junk location or topic
+@pytest.mark.parametrize("query", [
+    "what is the weather?",
+    "what's the weather",
+    "how is the weather",
+    "current weather",
+    "tomorrow weather",
+    "paris and london weather",
+    "london weather forecast",
+    "weather in paris this weekend",
+    "temperature in paris in celsius",
+    "weather in tokyo please",
+    "weather at home",
+    "nice weather",
+    "good news",
+    "no news",
+    "fake news",
+])
+def test_fast_intent_falls_through(query):
+    """Test that queries whose capture isn't a known place or topic go to the LLM"""
+    assert _fast_intent(query, is_known) is None
+
+@pytest.mark.parametrize("query, location", [
+    ("tokyo weather", "tokyo"),
+    ("new york weather", "new york"),
+    ("weather in paris", "paris"),
+    ("what's the temperature in new york?", "new york"),
+])
+def test_fast_intent_weather_location(query, location):
+    """Test that weather queries for known places skip the LLM"""
+    intent = _fast_intent(query, is_known)
+    assert intent["weather"] == {"needed": True, "location": location}
+    assert intent["news"]["needed"] is False
+
+def test_fast_intent_unknown_place_goes_to_llm():
+    """Test that a well-formed query for a place not yet geocoded is not trusted"""
+    assert _fast_intent("weather in reykjavik", is_known) is None
+
+@pytest.mark.parametrize("query, topic", [
+    ("latest tech news", "tech"),
+    ("sports news", "sports"),
+    ("top headlines", "general"),
+    ("news", "general"),
+])
+def test_fast_intent_news_topic(query, topic):
+    """Test that news queries with a known or no topic skip the LLM"""
+    intent = _fast_intent(query, is_known)
+    assert intent["news"] == {"needed": True, "topic": topic}
+    assert intent["weather"]["needed"] is False
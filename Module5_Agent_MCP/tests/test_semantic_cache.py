@@ -0,0 +1,30 @@
+import numpy as np
+from agents import semantic_cache
+from agents.semantic_cache import EMBEDDING_DIM, SemanticCache
+
+def _unit(seed):
+    vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+def test_hit_for_same_model():
+    """Test that a stored response is returned for the same vector and model"""
+    cache = SemanticCache(max_entries=4)
+    vector = _unit(0)
+    cache.put(vector, "tokyo weather", "gpt-4o-mini", {"text": "sunny"})
+    
+    assert cache.get(vector, "gpt-4o-mini") == {"text": "sunny"}
+    assert cache.get(vector, "gpt-4o") is None
+
+def test_expired_entry_misses(monkeypatch):
+    """Test that entries older than ttl no longer match and free their slot"""
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(max_entries=4, ttl=60)
+    vector = _unit(1)
+    cache.put(vector, "tokyo weather", "gpt-4o-mini", {"text": "sunny"})
+    
+    now[0] += 59
+    assert cache.get(vector, "gpt-4o-mini") == {"text": "sunny"}
+    now[0] += 2
+    assert cache.get(vector, "gpt-4o-mini") is None
+    assert len(cache) == 0
@@ -2,18 +2,114 @@
 # - create_order
 # - get_orders with pagination and filtering:
 #   filters: status, min_amount, max_amount, date_from, date_to
+# - list_orders_cursor: keyset pagination on (created_at, id)
+# - count_orders: filtered totals, cached for a short TTL
+# - stream_orders: one page as a row iterator, for NDJSON responses
+# List reads select the table's columns and return plain Rows: no ORM
+# instances, identity map or change tracking for read-only pages
 
+from sqlalchemy import func, lambda_stmt, literal, select, tuple_
 from sqlalchemy.orm import Session
 from . import models, schemas   
+from collections import OrderedDict
 from datetime import datetime
+import base64
+import threading
+import time
+
+COUNT_CACHE_TTL = 30.0  # seconds
+COUNT_CACHE_SIZE = 256
+
+# filter tuple -> (monotonic time stored, total); LRU order
+_count_cache: OrderedDict = OrderedDict()
+_count_lock = threading.Lock()
+
+def invalidate_order_counts():
+    """Drop cached totals; call after writing orders outside this module"""
+    with _count_lock:
+        _count_cache.clear()
 
 def create_order(db: Session, customer_name: str, status: str, amount: float) -> models.Order:
     db_order = models.Order(customer_name=customer_name, status=status, amount=amount)
     db.add(db_order)
     db.commit()
+    invalidate_order_counts()
     db.refresh(db_order)
     return db_order
 
+def encode_cursor(order) -> str:
+    """Opaque cursor pointing just past the given order (ORM object or Row)"""
+    raw = f"{order.created_at.isoformat()}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor"""
+    try:
+        ts, order_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(order_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+_NEWEST_FIRST = (models.Order.created_at.desc(), models.Order.id.desc())
+
+def _filter_conditions(
+    status: str | None,
+    min_amount: float | None,
+    max_amount: float | None,
+    start_date: datetime | None,
+    end_date: datetime | None
+) -> list:
+    """WHERE clauses for the list filters, status first to match the composite index"""
+    conds = []
+    if status:
+        conds.append(models.Order.status == status)
+    if start_date:
+        conds.append(models.Order.created_at >= start_date)
+    if end_date:
+        conds.append(models.Order.created_at <= end_date)
+    if min_amount is not None:
+        conds.append(models.Order.amount >= min_amount)
+    if max_amount is not None:
+        conds.append(models.Order.amount <= max_amount)
+    return conds
+
+def count_orders(
+    db: Session,
+    status: str | None,
+    min_amount: float | None,
+    max_amount: float | None,
+    start_date: datetime | None,
+    end_date: datetime | None
+) -> int:
+    """COUNT(*) for the filters, served from a short-TTL LRU between writes"""
+    key = (status, min_amount, max_amount, start_date, end_date)
+    total = _cached_count(key)
+    if total is not None:
+        return total
+
+    conds = _filter_conditions(status, min_amount, max_amount, start_date, end_date)
+    # Plain COUNT(*) ... WHERE, not Query.count()'s subquery wrapper
+    total = db.execute(
+        select(func.count()).select_from(models.Order).where(*conds)
+    ).scalar_one()
+    _store_count(key, total)
+    return total
+
+def _cached_count(key: tuple) -> int | None:
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit is not None and time.monotonic() - hit[0] < COUNT_CACHE_TTL:
+            _count_cache.move_to_end(key)
+            return hit[1]
+    return None
+
+def _store_count(key: tuple, total: int):
+    with _count_lock:
+        _count_cache[key] = (time.monotonic(), total)
+        _count_cache.move_to_end(key)
+        if len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+
 def get_orders(
     db: Session,
     page: int,
@@ -22,27 +118,144 @@ def get_orders(
     min_amount: float | None,
     max_amount: float | None,
     start_date: datetime | None,
-    end_date: datetime | None
+    end_date: datetime | None,
+    count: bool = True
 ):
-    query = db.query(models.Order)
+    """
+    Offset pagination. Returns (orders, total, has_next); total is None
+    when count is False, and has_next then comes from fetching one extra row.
+    An uncached total is read in the same query via COUNT(*) OVER ().
+    """
+    key = (status, min_amount, max_amount, start_date, end_date)
+    total = _cached_count(key) if count else None
+    offset = (page - 1) * limit
+
+    # Filtering, sorting and paging all happen in SQL
+    if count and total is None:
+        # One round-trip for both the page and the total
+        stmt = _page_stmt(True, status, min_amount, max_amount, start_date, end_date, offset, limit)
+        result = db.execute(stmt).all()
+        orders = result
+        if result:
+            total = result[0].total
+            _store_count(key, total)
+        else:
+            # Past the last page there is no row to carry the total
+            total = count_orders(db, status, min_amount, max_amount, start_date, end_date)
+        return orders, total, page * limit < total
+
+    fetch = limit if count else limit + 1
+    stmt = _page_stmt(False, status, min_amount, max_amount, start_date, end_date, offset, fetch)
+    rows = db.execute(stmt).all()
+    orders = rows[:limit]
+
+    if not count:
+        return orders, None, len(rows) > limit
+    return orders, total, page * limit < total
+
+def _page_stmt(
+    with_total: bool,
+    status: str | None,
+    min_amount: float | None,
+    max_amount: float | None,
+    start_date: datetime | None,
+    end_date: datetime | None,
+    offset: int,
+    limit: int
+):
+    """
+    Offset page query as a lambda_stmt, so each combination of filters is
+    built and compiled once; filter values, offset and limit become bound
+    parameters. Mirrors _filter_conditions.
+    """
+    Order = models.Order
+    table = Order.__table__
+    if with_total:
+        stmt = lambda_stmt(lambda: select(table, func.count().over().label("total")))
+    else:
+        stmt = lambda_stmt(lambda: select(table))
     if status:
-        query = query.filter(models.Order.status == status)
-    if min_amount is not None:
-        query = query.filter(models.Order.amount >= min_amount)
-    if max_amount is not None:
-        query = query.filter(models.Order.amount <= max_amount)
+        stmt += lambda s: s.where(Order.status == status)
     if start_date:
-        query = query.filter(models.Order.created_at >= start_date)
+        stmt += lambda s: s.where(Order.created_at >= start_date)
     if end_date:
-        query = query.filter(models.Order.created_at <= end_date)
-    if min_amount and max_amount and min_amount > max_amount:
-        raise HTTPException(status_code=400, detail="min_amount cannot be greater than max_amount") # type: ignore
-    if start_date and end_date and start_date > end_date:
-        raise HTTPException(status_code=400, detail="start_date cannot be greater than end_date") # type: ignore
-
-    total = query.count()
-    orders = query.order_by(
-        models.Order.created_at.desc(), 
-        models.Order.id.desc()
-    ).offset((page - 1) * limit).limit(limit).all()
-    return orders, total
+        stmt += lambda s: s.where(Order.created_at <= end_date)
+    if min_amount is not None:
+        stmt += lambda s: s.where(Order.amount >= min_amount)
+    if max_amount is not None:
+        stmt += lambda s: s.where(Order.amount <= max_amount)
+    stmt += lambda s: s.order_by(Order.created_at.desc(), Order.id.desc()).offset(offset).limit(limit)
+    return stmt
+
+def list_orders_cursor(
+    db: Session,
+    cursor: str,
+    limit: int,
+    status: str | None,
+    min_amount: float | None,
+    max_amount: float | None,
+    start_date: datetime | None,
+    end_date: datetime | None,
+    count: bool = True
+):
+    """
+    Keyset pagination: seek past the cursor row via the (created_at, id)
+    ordering instead of OFFSET, so deep pages cost the same as the first.
+    Returns (orders, total, next_cursor); next_cursor is None on the last page,
+    total is None when count is False.
+    """
+    # One extra row tells whether another page follows; a bad cursor fails before any query
+    stmt = _cursor_stmt(cursor, limit + 1, status, min_amount, max_amount, start_date, end_date)
+    total = count_orders(db, status, min_amount, max_amount, start_date, end_date) if count else None
+    rows = db.execute(stmt).all()
+
+    orders = rows[:limit]
+    next_cursor = encode_cursor(orders[-1]) if len(rows) > limit else None
+    return orders, total, next_cursor
+
+def _cursor_stmt(
+    cursor: str,
+    limit: int,
+    status: str | None,
+    min_amount: float | None,
+    max_amount: float | None,
+    start_date: datetime | None,
+    end_date: datetime | None
+):
+    """Keyset page query: rows strictly after the cursor's (created_at, id)"""
+    c_ts, c_id = decode_cursor(cursor)
+    conds = _filter_conditions(status, min_amount, max_amount, start_date, end_date)
+    # Bind the cursor values with the column types so they compare in the stored format
+    return select(models.Order.__table__).where(
+        *conds,
+        tuple_(models.Order.created_at, models.Order.id) < tuple_(
+            literal(c_ts, models.Order.created_at.type),
+            literal(c_id, models.Order.id.type)
+        )
+    ).order_by(*_NEWEST_FIRST).limit(limit)
+
+STREAM_BATCH_SIZE = 50
+
+def stream_orders(
+    db: Session,
+    page: int,
+    cursor: str | None,
+    limit: int,
+    status: str | None,
+    min_amount: float | None,
+    max_amount: float | None,
+    start_date: datetime | None,
+    end_date: datetime | None
+):
+    """
+    Iterate one page (offset or keyset) without materializing it: rows are
+    fetched from a server-side cursor STREAM_BATCH_SIZE at a time. No total
+    is computed. Raises ValueError on a malformed cursor before any row is read.
+    """
+    if cursor is not None:
+        stmt = _cursor_stmt(cursor, limit, status, min_amount, max_amount, start_date, end_date)
+    else:
+        stmt = _page_stmt(False, status, min_amount, max_amount, start_date, end_date, (page - 1) * limit, limit)
+    return db.execute(
+        stmt, execution_options={"yield_per": STREAM_BATCH_SIZE, "stream_results": True}
+    )
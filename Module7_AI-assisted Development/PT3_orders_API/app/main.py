@@ -2,10 +2,11 @@
 # Include orders router
 # Create database tables on startup
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from .routes.orders import router
 from . import database
 from contextlib import asynccontextmanager
+import orjson
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -23,13 +24,16 @@ app.include_router(router)
 def on_startup():
     database.Base.metadata.create_all(bind=database.engine)
 
+# The welcome payload never changes: encode it once at import
+WELCOME = orjson.dumps({
+    "message": "Welcome to the Orders API! Visit /docs for API documentation.",
+    "docs": "/docs",
+    "endpoints": {
+        "create_order": "/orders (POST)",
+        "list_orders": "/orders (GET)"
+    }
+})
+
 @app.get("/")
 def root():
-    return {
-        "message": "Welcome to the Orders API! Visit /docs for API documentation.",
-        "docs": "/docs",
-        "endpoints": {
-            "create_order": "/orders (POST)",
-            "list_orders": "/orders (GET)"
-        }
-    }
\ No newline at end of file
+    return Response(content=WELCOME, media_type="application/json")
@@ -1,16 +1,42 @@
 # Define Order model with:
 # id, customer_name, status, amount, created_at
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from .database import Base  
 
+# SQLite's CURRENT_TIMESTAMP has no fractional part; binding datetimes in the
+# same text format keeps comparisons against created_at (e.g. the keyset
+# cursor) from tripping over the extra ".000000"
+_SQLITE_DATETIME = sqlite.DATETIME(
+    storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+)
+
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
     customer_name = Column(String, index=True, nullable=False)
-    status = Column(String, index=True, nullable=False, default="pending")
+    # Indexed via ix_orders_status_created_cov, whose leading column it is
+    status = Column(String, nullable=False, default="pending")
     amount = Column(Float, nullable=False, default=0.0)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Stamped by the database, not per-row in Python; ties are broken by id
+    created_at = Column(
+        DateTime(timezone=True).with_variant(_SQLITE_DATETIME, "sqlite"),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    # Equality column first, then the sort columns, so filtered listings are
+    # an index range scan already in ORDER BY created_at DESC, id DESC order.
+    # The remaining columns trail the key (SQLite has no INCLUDE), making it
+    # covering: status-filtered pages never read the table
+    __table_args__ = (
+        Index(
+            "ix_orders_status_created_cov",
+            "status", created_at.desc(), id.desc(), "amount", "customer_name"
+        ),
+        Index("ix_orders_created_amount", created_at.desc(), id.desc(), "amount"),
+    )
     def __repr__(self):
         return f"<Order(id={self.id}, customer={self.customer_name}, status={self.status})>"
\ No newline at end of file
@@ -2,54 +2,131 @@
 # Create a new order and return it
 
 # GET /orders
-# Support pagination using page and limit query params
+# Support pagination using page and limit query params,
+# or keyset pagination using the cursor returned in the previous page
+# Stream rows as NDJSON when the client sends Accept: application/x-ndjson
+
+# HEAD /orders
+# Same filters; only the total, as X-Total-Count / X-Total-Pages headers
 # Support filtering by:
 # - status
 # - amount range
 # - created_at date range
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from datetime import datetime
-from .. import schemas, crud, database  
+from typing import Annotated
+from .. import schemas, crud, database, models  
 import math
+import orjson
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+_ORDER_COLUMNS = tuple(c.key for c in models.Order.__table__.columns)
+
+def to_dict(order: models.Order) -> dict:
+    """Plain column dict of an order, from an ORM object or a Row"""
+    return {key: getattr(order, key) for key in _ORDER_COLUMNS}
+
+def _page_response(orders: list, pagination: dict) -> Response:
+    """
+    Encode a list page with orjson (datetimes natively, no per-row callbacks).
+    Returning a Response skips response_model validation; the model still
+    documents the shape in OpenAPI.
+    """
+    body = orjson.dumps({"data": [to_dict(o) for o in orders], "pagination": pagination})
+    return Response(content=body, media_type="application/json")
+
+NDJSON = "application/x-ndjson"
+
+def _ndjson_response(rows) -> StreamingResponse:
+    """One orjson-encoded order per line, written as rows come off the DB cursor"""
+    return StreamingResponse(
+        (orjson.dumps(to_dict(o)) + b"\n" for o in rows), media_type=NDJSON
+    )
+
 @router.post("/", response_model=schemas.OrderResponse, status_code=201)
 def create_order(order_in: schemas.OrderCreate, db: Session = Depends(database.get_db)):
     return crud.create_order(db, order_in.customer_name, order_in.status, order_in.amount)
 
 @router.get("/", response_model=schemas.PaginatedOrderResponse)
 def list_orders(
-    page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(10, ge=1, le=100, description="Items per page"),
-    status: str | None = Query(None, description="Filter by status"),
-    min_amount: float | None = Query(None, ge=0, description="Min amount"),
-    max_amount: float | None = Query(None, ge=0, description="Max amount"),
-    start_date: datetime | None = Query(None, description="Start date"),
-    end_date: datetime | None = Query(None, description="End date"),
+    # Query parameter model: field and cross-field (range) validation both
+    # happen before a DB session is opened; failures return 422
+    filters: Annotated[schemas.OrderFilters, Query()],
+    request: Request,
     db: Session = Depends(database.get_db)
 ):
-   # Get orders and total count
-    orders, total = crud.get_orders(
-        db, page, limit, status, min_amount, max_amount, start_date, end_date
+    if NDJSON in request.headers.get("accept", ""):
+        # Rows only: no pagination envelope, no total
+        try:
+            rows = crud.stream_orders(
+                db, filters.page, filters.cursor, filters.limit,
+                filters.status, filters.min_amount, filters.max_amount,
+                filters.start_date, filters.end_date
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return _ndjson_response(rows)
+    
+    if filters.cursor is not None:
+        # Keyset mode: seek straight past the cursor row, no OFFSET scan
+        try:
+            orders, total, next_cursor = crud.list_orders_cursor(
+                db, filters.cursor, filters.limit,
+                filters.status, filters.min_amount, filters.max_amount,
+                filters.start_date, filters.end_date, filters.count
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        return _page_response(orders, {
+            "total": total,
+            "page": None,
+            "limit": filters.limit,
+            "total_pages": None,
+            "has_next": next_cursor is not None,
+            "has_previous": True,
+            "next_cursor": next_cursor
+        })
+    
+   # Get orders and (optionally) total count
+    orders, total, has_next = crud.get_orders(
+        db, filters.page, filters.limit,
+        filters.status, filters.min_amount, filters.max_amount,
+        filters.start_date, filters.end_date, filters.count
     )
     
     # Calculate pagination metadata
-    total_pages = math.ceil(total / limit) if total > 0 else 0
-    has_next = page < total_pages
-    has_previous = page > 1
+    if total is None:
+        total_pages = None
+    else:
+        total_pages = math.ceil(total / filters.limit) if total > 0 else 0
+    has_previous = filters.page > 1
     
-    return schemas.PaginatedOrderResponse(
-        data=orders,  # type: ignore
-        pagination=schemas.PaginationMeta(
-            total=total,
-            page=page,
-            limit=limit,
-            total_pages=total_pages,
-            has_next=has_next,
-            has_previous=has_previous
-        )
-    )
+    return _page_response(orders, {
+        "total": total,
+        "page": filters.page,
+        "limit": filters.limit,
+        "total_pages": total_pages,
+        "has_next": has_next,
+        "has_previous": has_previous,
+        # Lets clients switch to keyset pagination after any page
+        "next_cursor": crud.encode_cursor(orders[-1]) if has_next and orders else None
+    })
 
+@router.head("/")
+def head_orders(
+    filters: Annotated[schemas.OrderFilters, Query()],
+    db: Session = Depends(database.get_db)
+):
+    # Only the (cached) COUNT query runs; no rows are selected or encoded
+    total = crud.count_orders(
+        db, filters.status, filters.min_amount, filters.max_amount,
+        filters.start_date, filters.end_date
+    )
+    return Response(status_code=200, headers={
+        "X-Total-Count": str(total),
+        "X-Total-Pages": str(math.ceil(total / filters.limit))
+    })
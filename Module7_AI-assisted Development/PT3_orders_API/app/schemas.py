@@ -1,7 +1,7 @@
 # Create Pydantic schemas for OrderCreate and OrderResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from datetime import datetime
-from typing import List 
+from typing import List, Optional
 
 class OrderCreate(BaseModel):
     customer_name: str = Field(..., min_length=1, max_length=200)
@@ -27,13 +27,34 @@ class OrderResponse(BaseModel):
 
     model_config = {"from_attributes": True}
 
+class OrderFilters(BaseModel):
+    """Query parameters of GET /orders/, validated before the DB is touched"""
+    page: int = Field(1, ge=1, description="Page number")
+    limit: int = Field(10, ge=1, le=100, description="Items per page")
+    cursor: Optional[str] = Field(None, description="next_cursor from the previous page; overrides page")
+    status: Optional[str] = Field(None, description="Filter by status")
+    min_amount: Optional[float] = Field(None, ge=0, description="Min amount")
+    max_amount: Optional[float] = Field(None, ge=0, description="Max amount")
+    start_date: Optional[datetime] = Field(None, description="Start date")
+    end_date: Optional[datetime] = Field(None, description="End date")
+    count: bool = Field(True, description="Include pagination.total (skips the COUNT query when false)")
+
+    @model_validator(mode="after")
+    def check_ranges(self):
+        if self.min_amount is not None and self.max_amount is not None and self.min_amount > self.max_amount:
+            raise ValueError("min_amount cannot be greater than max_amount")
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError("start_date cannot be greater than end_date")
+        return self
+
 class PaginationMeta(BaseModel):
-    total: int = Field(..., description="Total number of items")
-    page: int = Field(..., ge=1, description="Current page number")
+    total: Optional[int] = Field(..., description="Total number of items (null with count=false)")
+    page: Optional[int] = Field(None, ge=1, description="Current page number (offset mode only)")
     limit: int = Field(..., ge=1, le=100, description="Items per page")
-    total_pages: int = Field(..., ge=0, description="Total pages")
+    total_pages: Optional[int] = Field(None, ge=0, description="Total pages (offset mode only)")
     has_next: bool = Field(..., description="Has next page")
     has_previous: bool = Field(..., description="Has previous page")
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= to fetch the next page")
 
 class PaginatedOrderResponse(BaseModel):
     data: List[OrderResponse]
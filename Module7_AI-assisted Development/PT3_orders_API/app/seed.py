@@ -3,7 +3,7 @@
 from faker import Faker
 from sqlalchemy.orm import Session
 from .database import SessionLocal, create_tables
-from . import models    
+from . import crud, models    
 import sys
 fake = Faker()
 
@@ -16,6 +16,7 @@ def seed_database(db: Session, num_orders: int):
         )
         db.add(order)
     db.commit()
+    crud.invalidate_order_counts()
 
 if __name__ == "__main__":
     create_tables()
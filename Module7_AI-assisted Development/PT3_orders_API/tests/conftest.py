@@ -0,0 +1,127 @@
+import httpx
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.database import Base, get_db
+from app import crud, models
+
+# Create test database: in-memory, one connection shared by every session
+# (StaticPool), so the schema survives between tests
+TEST_DATABASE_URL = "sqlite://"
+engine = create_engine(
+    TEST_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Override dependency
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = override_get_db
+
+# Setup and teardown
+@pytest.fixture(scope="session", autouse=True)
+def create_schema():
+    """Create tables once for the whole run"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+# Canonical dataset shared by the read-only filter tests (see seeded_orders)
+SEED_ORDERS = [
+    {"customer_name": "Alice", "status": "completed", "amount": 200.0},
+    {"customer_name": "Bob", "status": "pending", "amount": 150.0},
+    {"customer_name": "Carol", "status": "completed", "amount": 300.0},
+    {"customer_name": "User1", "status": "pending", "amount": 50.0},
+    {"customer_name": "User3", "status": "pending", "amount": 250.0},
+    {"customer_name": "Grace", "status": "completed", "amount": 80.0},
+]
+_seed_loaded = False
+
+@pytest.fixture(autouse=True)
+def truncate_tables(request):
+    """
+    Empty every table before each test; much cheaper than drop + create.
+    Tests using seeded_orders keep the seed if it is still in place.
+    """
+    global _seed_loaded
+    if _seed_loaded and "seeded_orders" in request.fixturenames:
+        return
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    _seed_loaded = False
+    crud.invalidate_order_counts()
+
+@pytest.fixture
+def seeded_orders():
+    """
+    SEED_ORDERS, inserted once and reused by consecutive tests that request it
+    until another test truncates. Tests using it must not write orders.
+    """
+    global _seed_loaded
+    if not _seed_loaded:
+        with TestingSessionLocal() as db:
+            db.execute(insert(models.Order), SEED_ORDERS)
+            db.commit()
+        crud.invalidate_order_counts()
+        _seed_loaded = True
+    return SEED_ORDERS
+
+@pytest.fixture
+def anyio_backend():
+    """Run async tests on asyncio only (anyio's pytest plugin)"""
+    return "asyncio"
+
+@pytest.fixture
+async def async_client():
+    """httpx client calling the app in-process, for tests that overlap requests"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://t") as ac:
+        yield ac
+
+@pytest.fixture
+def db_engine():
+    """Engine of the test database"""
+    return engine
+
+@pytest.fixture
+def sql_statements():
+    """
+    SQL strings sent to the test database while the test runs, in order.
+    Call .clear() right before the request under test to drop setup queries.
+    """
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+@pytest.fixture
+def bulk_orders():
+    """
+    Insert n orders in one statement and one commit, bypassing the API.
+    Rows are User0..User{n-1} with amount 100 + i; keyword args override any column.
+    """
+    def _bulk_orders(n: int, **overrides):
+        rows = [
+            {"customer_name": f"User{i}", "status": "pending", "amount": 100 + i, **overrides}
+            for i in range(n)
+        ]
+        with TestingSessionLocal() as db:
+            db.execute(insert(models.Order), rows)
+            db.commit()
+        crud.invalidate_order_counts()
+    
+    return _bulk_orders
@@ -1,37 +1,16 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from datetime import datetime, timedelta, timezone
+import orjson
+from operator import itemgetter
+from sqlalchemy import text
 from app.main import app
-from app.database import Base, get_db
 from app import models
 
-# Create test database
-TEST_DATABASE_URL = "sqlite:///./test_orders.db"
-engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Override dependency
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
+# Test database, dependency override and fixtures live in conftest.py
 client = TestClient(app)
 
-# Setup and teardown
-@pytest.fixture(autouse=True)
-def setup_database():
-    """Create fresh database for each test"""
-    Base.metadata.create_all(bind=engine)
-    yield
-    Base.metadata.drop_all(bind=engine)
-
 def create_order(payload=None):
     """Helper function to create an order"""
     if payload is None:
@@ -42,6 +21,10 @@ def create_order(payload=None):
         }
     return client.post("/orders/", json=payload)
 
+def _col(data, name):
+    """One field of every order in a list response"""
+    return list(map(itemgetter(name), data["data"]))
+
 # ========== BASIC CRUD TESTS ==========
 
 def test_create_order_success():
@@ -103,18 +86,13 @@ def test_pagination_metadata_structure():
     assert "total_pages" in pagination
     assert "has_next" in pagination
     assert "has_previous" in pagination
+    assert "next_cursor" in pagination
 
-def test_pagination_metadata_values():
+def test_pagination_metadata_values(bulk_orders):
     """Test pagination metadata calculates correctly"""
-    # Create 25 orders
-    for i in range(25):
-        create_order({
-            "customer_name": f"User{i}", 
-            "status": "pending", 
-            "amount": 100 + i
-        })
-    
-    r = client.get("/orders/?page=1&limit=10")
+    bulk_orders(25)
+    
+    r = client.get("/orders/?page=1&limit=10&count=true")
     data = r.json()
     
     assert data["pagination"]["total"] == 25
@@ -123,15 +101,49 @@ def test_pagination_metadata_values():
     assert data["pagination"]["total_pages"] == 3
     assert data["pagination"]["has_next"] is True
     assert data["pagination"]["has_previous"] is False
+    assert data["pagination"]["next_cursor"] is not None
+
+def test_pagination_without_count(bulk_orders):
+    """Test count=false skips the total but still reports has_next"""
+    bulk_orders(15)
+    
+    r = client.get("/orders/?page=1&limit=10&count=false")
+    pagination = r.json()["pagination"]
+    assert pagination["total"] is None
+    assert pagination["total_pages"] is None
+    assert pagination["has_next"] is True
+    
+    r = client.get("/orders/?page=2&limit=10&count=false")
+    data = r.json()
+    assert len(data["data"]) == 5
+    assert data["pagination"]["has_next"] is False
+
+def test_cached_total_refreshes_after_create():
+    """Test that a new order invalidates the cached total"""
+    create_order()
+    assert client.get("/orders/").json()["pagination"]["total"] == 1
+    create_order()
+    assert client.get("/orders/").json()["pagination"]["total"] == 2
+
+def test_pagination_last_page(bulk_orders):
+    """Test pagination on last page, reached by following next_cursor"""
+    bulk_orders(25)
+    
+    r = client.get("/orders/?limit=10")
+    cursor = r.json()["pagination"]["next_cursor"]
+    r = client.get(f"/orders/?limit=10&cursor={cursor}")
+    cursor = r.json()["pagination"]["next_cursor"]
+    r = client.get(f"/orders/?limit=10&cursor={cursor}")
+    data = r.json()
+    
+    assert data["pagination"]["has_next"] is False
+    assert data["pagination"]["has_previous"] is True
+    assert data["pagination"]["next_cursor"] is None
+    assert len(data["data"]) == 5  # 25 total, 10 per page, page 3 has 5
 
-def test_pagination_last_page():
-    """Test pagination on last page"""
-    for i in range(25):
-        create_order({
-            "customer_name": f"User{i}", 
-            "status": "pending", 
-            "amount": 100
-        })
+def test_pagination_last_page_offset(bulk_orders):
+    """Test offset pagination (?page=) on last page"""
+    bulk_orders(25)
     
     r = client.get("/orders/?page=3&limit=10")
     data = r.json()
@@ -139,18 +151,13 @@ def test_pagination_last_page():
     assert data["pagination"]["page"] == 3
     assert data["pagination"]["has_next"] is False
     assert data["pagination"]["has_previous"] is True
-    assert len(data["data"]) == 5  # 25 total, 10 per page, page 3 has 5
+    assert len(data["data"]) == 5
 
 # ========== PAGINATION TESTS ==========
 
-def test_default_pagination():
+def test_default_pagination(bulk_orders):
     """Test default pagination values"""
-    for i in range(15):
-        create_order({
-            "customer_name": f"User{i}", 
-            "status": "pending", 
-            "amount": 100
-        })
+    bulk_orders(15)
     
     r = client.get("/orders/")
     assert r.status_code == 200
@@ -158,20 +165,97 @@ def test_default_pagination():
     assert len(data["data"]) == 10  # default limit
     assert data["pagination"]["page"] == 1
 
-def test_custom_pagination():
+def test_custom_pagination(bulk_orders):
     """Test custom page and limit"""
-    for i in range(30):
-        create_order({
-            "customer_name": f"User{i}", 
-            "status": "pending", 
-            "amount": 100
-        })
+    bulk_orders(30)
     
     r = client.get("/orders/?page=2&limit=5")
     data = r.json()
     assert len(data["data"]) == 5
     assert data["pagination"]["page"] == 2
 
+def test_cursor_pagination_walks_all_orders(bulk_orders):
+    """Test following next_cursor visits every order once, newest first"""
+    bulk_orders(30)
+    
+    ids = []
+    pages = 0
+    r = client.get("/orders/?limit=7")
+    while True:
+        data = r.json()
+        ids.extend(order["id"] for order in data["data"])
+        pages += 1
+        cursor = data["pagination"]["next_cursor"]
+        if cursor is None:
+            break
+        r = client.get(f"/orders/?limit=7&cursor={cursor}")
+    
+    assert pages == 5  # 30 orders, 7 per page
+    assert len(ids) == len(set(ids)) == 30
+    assert ids == sorted(ids, reverse=True)  # same created_at second -> id tiebreak
+
+@pytest.mark.anyio
+async def test_concurrent_page_requests(async_client, bulk_orders):
+    """Test that pages fetched concurrently are disjoint and cover every order"""
+    bulk_orders(25)
+    
+    responses = await asyncio.gather(
+        *(async_client.get(f"/orders/?page={page}&limit=10") for page in (1, 2, 3))
+    )
+    assert all(r.status_code == 200 for r in responses)
+    ids = [o["id"] for r in responses for o in r.json()["data"]]
+    assert len(ids) == len(set(ids)) == 25
+
+def test_ndjson_stream(bulk_orders):
+    """Test Accept: application/x-ndjson streams one order per line"""
+    bulk_orders(25)
+    
+    with client.stream(
+        "GET", "/orders/?page=2&limit=10&status=pending",
+        headers={"Accept": "application/x-ndjson"}
+    ) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        rows = [orjson.loads(line) for line in r.iter_lines() if line]
+    
+    assert len(rows) == 10
+    assert all(row["status"] == "pending" for row in rows)
+    json_page = client.get("/orders/?page=2&limit=10&status=pending").json()["data"]
+    assert [row["id"] for row in rows] == [o["id"] for o in json_page]
+
+def test_head_returns_totals_only(sql_statements, bulk_orders):
+    """Test HEAD reports the filtered total in headers from a single COUNT query"""
+    assert client.head("/orders/").headers["X-Total-Count"] == "0"
+    
+    bulk_orders(25)
+    sql_statements.clear()
+    r = client.head("/orders/?status=pending&limit=10")
+    
+    assert r.status_code == 200
+    assert r.headers["X-Total-Count"] == "25"
+    assert r.headers["X-Total-Pages"] == "3"
+    assert r.content == b""
+    assert len(sql_statements) == 1 and "count(*)" in sql_statements[0].lower()
+
+def test_cursor_pagination_with_filters(bulk_orders):
+    """Test that filters apply to cursor pages as well"""
+    bulk_orders(5, status="completed")
+    bulk_orders(5, status="pending")
+    
+    r = client.get("/orders/?status=completed&limit=3")
+    cursor = r.json()["pagination"]["next_cursor"]
+    r = client.get(f"/orders/?status=completed&limit=3&cursor={cursor}")
+    data = r.json()
+    assert len(data["data"]) == 2
+    assert all(order["status"] == "completed" for order in data["data"])
+    assert data["pagination"]["total"] == 5
+
+def test_invalid_cursor():
+    """Test that a malformed cursor returns 400"""
+    r = client.get("/orders/?cursor=not-a-cursor")
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Invalid cursor"
+
 def test_max_limit_enforcement():
     """Test that limit cannot exceed 100"""
     r = client.get("/orders/?limit=150")
@@ -192,54 +276,51 @@ def test_empty_page_beyond_results():
 
 # ========== FILTERING TESTS ==========
 
-def test_filter_by_status():
+def test_filter_by_status(seeded_orders):
     """Test filtering by status"""
-    create_order({"customer_name": "Alice", "status": "completed", "amount": 200})
-    create_order({"customer_name": "Bob", "status": "pending", "amount": 150})
-    create_order({"customer_name": "Carol", "status": "completed", "amount": 300})
+    expected = [o for o in seeded_orders if o["status"] == "completed"]
     
     r = client.get("/orders/?status=completed&limit=100")
     data = r.json()
-    assert data["pagination"]["total"] == 2
-    assert all(order["status"] == "completed" for order in data["data"])
+    assert data["pagination"]["total"] == len(expected)
+    assert set(_col(data, "status")) == {"completed"}
 
-def test_filter_by_amount_range():
+def test_filter_by_amount_range(seeded_orders):
     """Test filtering by amount range"""
-    create_order({"customer_name": "User1", "status": "pending", "amount": 50})
-    create_order({"customer_name": "User2", "status": "pending", "amount": 150})
-    create_order({"customer_name": "User3", "status": "pending", "amount": 250})
+    expected = [o for o in seeded_orders if 100 <= o["amount"] <= 200]
     
     r = client.get("/orders/?min_amount=100&max_amount=200")
     data = r.json()
-    assert data["pagination"]["total"] == 1
-    assert all(100 <= order["amount"] <= 200 for order in data["data"])
+    assert data["pagination"]["total"] == len(expected)
+    amounts = _col(data, "amount")
+    assert 100 <= min(amounts) and max(amounts) <= 200
 
 def test_filter_by_date_range():
     """Test filtering by date range"""
-    now = datetime.now()
+    # created_at is stamped by the database in UTC
+    now = datetime.now(timezone.utc)
     yesterday = now - timedelta(days=1)
     tomorrow = now + timedelta(days=1)
     
     create_order()
     
+    # params= so the "+00:00" offset is URL-encoded
     r = client.get(
-        f"/orders/?start_date={yesterday.isoformat()}&end_date={tomorrow.isoformat()}"
+        "/orders/",
+        params={"start_date": yesterday.isoformat(), "end_date": tomorrow.isoformat()}
     )
     assert r.status_code == 200
     assert r.json()["pagination"]["total"] >= 1
 
-def test_combined_filters():
+def test_combined_filters(seeded_orders):
     """Test multiple filters together"""
-    create_order({"customer_name": "Frank", "status": "completed", "amount": 250})
-    create_order({"customer_name": "Grace", "status": "completed", "amount": 80})
-    create_order({"customer_name": "Heidi", "status": "pending", "amount": 150})
+    expected = [o for o in seeded_orders if o["status"] == "completed" and o["amount"] >= 100]
     
     r = client.get("/orders/?status=completed&min_amount=100&limit=100")
     data = r.json()
-    assert all(
-        order["status"] == "completed" and order["amount"] >= 100 
-        for order in data["data"]
-    )
+    assert data["pagination"]["total"] == len(expected)
+    assert set(_col(data, "status")) == {"completed"}
+    assert min(_col(data, "amount")) >= 100
 
 # ========== EDGE CASES ==========
 
@@ -251,23 +332,18 @@ def test_no_results():
     assert data["pagination"]["total"] == 0
     assert data["pagination"]["total_pages"] == 0
 
-def test_no_results_for_filter():
+def test_no_results_for_filter(seeded_orders):
     """Test when filters match nothing"""
-    create_order({"customer_name": "Test", "status": "pending", "amount": 100})
+    assert not any(o["status"] == "cancelled" for o in seeded_orders)
     
     r = client.get("/orders/?status=cancelled")
     data = r.json()
     assert len(data["data"]) == 0
     assert data["pagination"]["total"] == 0
 
-def test_performance_large_dataset():
+def test_performance_large_dataset(bulk_orders):
     """Test with large dataset"""
-    for i in range(100):
-        create_order({
-            "customer_name": f"User{i}", 
-            "status": "pending", 
-            "amount": 100 + i
-        })
+    bulk_orders(100)
     
     r = client.get("/orders/?page=5&limit=20")
     data = r.json()
@@ -279,15 +355,14 @@ def test_performance_large_dataset():
 
 # ========== ADDITIONAL EDGE CASES ==========
 
-def test_filter_by_max_amount_only():
+def test_filter_by_max_amount_only(seeded_orders):
     """Test filtering by maximum amount only"""
-    create_order({"customer_name": "User1", "status": "pending", "amount": 50})
-    create_order({"customer_name": "User2", "status": "pending", "amount": 150})
-    create_order({"customer_name": "User3", "status": "pending", "amount": 250})
+    expected = [o for o in seeded_orders if o["amount"] <= 100]
     
     r = client.get("/orders/?max_amount=100")
     data = r.json()
-    assert all(order["amount"] <= 100 for order in data["data"])
+    assert data["pagination"]["total"] == len(expected)
+    assert max(_col(data, "amount")) <= 100
 
 def test_invalid_date_format():
     """Test that invalid date format returns validation error"""
@@ -306,16 +381,14 @@ def test_pagination_with_filters_empty_result():
     assert data["pagination"]["has_previous"] is False
     assert len(data["data"]) == 0
 
-def test_order_sorting_by_date():
+def test_order_sorting_by_date(bulk_orders):
     """Test that orders are returned in correct chronological order"""
-    import time
-    
-    # Create orders with small time gaps
-    create_order({"customer_name": "First", "status": "pending", "amount": 100})
-    time.sleep(0.1)
-    create_order({"customer_name": "Second", "status": "pending", "amount": 200})
-    time.sleep(0.1)
-    create_order({"customer_name": "Third", "status": "pending", "amount": 300})
+    # Explicit, increasing timestamps instead of sleeping between inserts;
+    # inserted out of order so the result can't just follow the id
+    t = datetime(2026, 1, 1, 12, 0, 0)
+    bulk_orders(1, customer_name="Second", created_at=t + timedelta(seconds=1))
+    bulk_orders(1, customer_name="Third", created_at=t + timedelta(seconds=2))
+    bulk_orders(1, customer_name="First", created_at=t)
     
     r = client.get("/orders/?limit=10")
     data = r.json()
@@ -332,38 +405,68 @@ def test_order_sorting_by_date():
 
 def test_filter_invalid_amount_range_logic():
     """
-    Hits app/crud.py line 45: 
-    Checks if min_amount > max_amount raises 400
+    Hits schemas.OrderFilters.check_ranges:
+    Checks if min_amount > max_amount is rejected with 422
     """
     r = client.get("/orders/?min_amount=100&max_amount=50")
-    assert r.status_code == 400
-    assert r.json()["detail"] == "min_amount cannot be greater than max_amount"
+    assert r.status_code == 422
+    assert "min_amount cannot be greater than max_amount" in r.json()["detail"][0]["msg"]
 
 def test_filter_invalid_date_range_logic():
     """
-    Hits app/crud.py line 47: 
-    Checks if start_date > end_date raises 400
+    Hits schemas.OrderFilters.check_ranges:
+    Checks if start_date > end_date is rejected with 422
     """
     now = datetime.now()
     start = now + timedelta(days=1)
     end = now - timedelta(days=1)
     
     r = client.get(f"/orders/?start_date={start.isoformat()}&end_date={end.isoformat()}")
-    assert r.status_code == 400
-    assert r.json()["detail"] == "start_date cannot be greater than end_date"
-
-def test_root_endpoint():
-    """
-    Hits app/main.py lines 27-33:
-    Tests the welcome message
-    """
-    r = client.get("/")
-    assert r.status_code == 200
-    assert "Welcome to the Orders API" in r.json()["message"]
+    assert r.status_code == 422
+    assert "start_date cannot be greater than end_date" in r.json()["detail"][0]["msg"]
 
 def test_model_repr():
     """Test the string representation of the Order model"""
     from app.models import Order
     order = Order(id=1, customer_name="Test", status="pending")
     # This triggers the __repr__ method in models.py
-    assert repr(order) == "<Order(id=1, customer=Test, status=pending)>"
\ No newline at end of file
+    assert repr(order) == "<Order(id=1, customer=Test, status=pending)>"
+
+def test_index_used(db_engine):
+    """Test that status filter + date sort is served by the covering composite index"""
+    from sqlalchemy.orm import Session
+    
+    with Session(db_engine) as db:
+        query = db.query(models.Order).filter(
+            models.Order.status == "completed"
+        ).order_by(
+            models.Order.created_at.desc(),
+            models.Order.id.desc()
+        ).limit(10)
+        sql = str(query.statement.compile(db_engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    
+    assert "COVERING INDEX ix_orders_status_created_cov" in plan  # no table lookups
+    assert "TEMP B-TREE" not in plan  # no separate sort step
+
+def test_pushdown(sql_statements, bulk_orders):
+    """Test that filters, sort and paging are applied in SQL, not in Python"""
+    bulk_orders(30)
+    sql_statements.clear()
+    r = client.get("/orders/?status=pending&min_amount=110&max_amount=120&page=2&limit=5")
+    
+    assert r.status_code == 200
+    data_sql = next(sql for sql in sql_statements if "ORDER BY" in sql)
+    assert "WHERE" in data_sql and "LIMIT" in data_sql and "OFFSET" in data_sql
+    assert len(r.json()["data"]) == 5  # 11 matches, page 2 of 5
+
+def test_single_query_pagination(sql_statements, bulk_orders):
+    """Test that a page and its total come back from a single SELECT"""
+    bulk_orders(25)
+    sql_statements.clear()
+    r = client.get("/orders/?page=2&limit=10")
+    
+    data = r.json()
+    assert len([sql for sql in sql_statements if sql.lstrip().upper().startswith("SELECT")]) == 1
+    assert data["pagination"]["total"] == 25
+    assert len(data["data"]) == 10
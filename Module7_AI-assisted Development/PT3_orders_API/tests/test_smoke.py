@@ -0,0 +1,13 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+# Quick checks that the app starts and answers; no orders needed
+client = TestClient(app)
+
+def test_root_endpoint():
+    """Tests the welcome message"""
+    r = client.get("/")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/json"
+    assert "Welcome to the Orders API" in r.json()["message"]
+    assert r.json()["endpoints"]["list_orders"] == "/orders (GET)"